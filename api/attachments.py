@@ -0,0 +1,85 @@
+"""Compressed, de-duplicated task message attachments
+"""
+import datetime
+import hashlib
+import zlib
+from api.database import etl_central_session
+from api.model import EtlAttachment
+
+# Attachments longer than this many characters are truncated
+MAX_ATTACHMENT_LENGTH = 1000000
+
+TRUNCATED = '\n\n... truncated {:,} characters'
+
+
+def prepare(text, max_length=None):
+    """Gets the hash, original length, truncation flag and
+    compressed content to store for an attachment.  Identical
+    attachments have the same hash, so are only stored once.
+    """
+    max_length = max_length or MAX_ATTACHMENT_LENGTH
+    size = len(text)
+    truncated = size > max_length
+
+    if truncated:
+        text = text[:max_length] + TRUNCATED.format(size - max_length)
+
+    data = text.encode('utf8')
+
+    return dict(
+        hash=hashlib.sha256(data).hexdigest(),
+        size=size,
+        truncated=truncated,
+        content=zlib.compress(data),
+    )
+
+
+def store(session, rows):
+    """Moves the attachment of each task message row to the
+    attachment table, replacing it with the attachment's hash.
+    """
+    attachments = {}
+
+    for r in rows:
+        if r.get('attachment') is None:
+            continue
+
+        a = prepare(r['attachment'])
+        attachments[a['hash']] = a
+
+        r['attachment'] = None
+        r['attachment_hash'] = a['hash']
+
+    if not attachments:
+        return
+
+    existing = {
+        h for h, in session.query(EtlAttachment.hash).filter(EtlAttachment.hash.in_(list(attachments)))
+    }
+
+    now = datetime.datetime.now()
+
+    session.bulk_insert_mappings(EtlAttachment, [
+        dict(a, created_datetime=now) for h, a in attachments.items() if h not in existing
+    ])
+
+
+def fetch(attachment_hash):
+    """Gets the text of a stored attachment"""
+    with etl_central_session() as session:
+        a = session.query(EtlAttachment).filter(EtlAttachment.hash == attachment_hash).one_or_none()
+
+        if a is None:
+            return None
+
+        return zlib.decompress(a.content).decode('utf8')
+
+
+def message_attachment(message):
+    """Gets the attachment of a task message, whether it is
+    stored with the message or in the attachment table.
+    """
+    if message.attachment_hash:
+        return fetch(message.attachment_hash)
+
+    return message.attachment
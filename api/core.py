@@ -8,11 +8,20 @@ import traceback
 import importlib
 import pkgutil
 import inspect
+import statistics
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from enum import Enum
 from api.emailing import email_error
 from api.selenium import SeleniumGrid
-from .model import EtlTask, EtlTaskMessage
+from .model import EtlTask
 from .database import etl_central_session
+from .message_sink import message_sink
+from .governor import governor, Resources
+from . import profiling
+
+# The expected duration of a step is the median of
+# its completed runs within this many days
+DURATION_HISTORY_DAYS = 30
 
 
 class Schedule(Enum):
@@ -90,14 +99,28 @@ class EtlStep:
         # Unpick CamelCase
         self._name = name or type(self).__name__
         self._name = re.sub('([a-z])([A-Z])', r'\1 \2', self._name)
+        self._task_id = None
 
     def run(self):
         try:
-            self.log_start()
-            self.do_etl()
-            self.log_end()
+            with governor.acquire(self.resources()) as lease:
+                self.log_start()
+
+                if lease.waited >= 1:
+                    self.log('Waited {:.0f} seconds for {}'.format(
+                        lease.waited,
+                        ', '.join(lease.hosts) or 'temporary disk space',
+                    ))
+
+                if profiling.enabled(self):
+                    self.profile_etl()
+                else:
+                    self.do_etl()
+
+                self.log_end()
 
             logging.info("{} ran".format(self._name))
+            return True
 
         except KeyboardInterrupt as e:
             raise e
@@ -108,7 +131,27 @@ class EtlStep:
                 log_level='ERROR',
             )
             logging.error(traceback.format_exc())
+
+            # Written first, so that the messages are kept
+            # even if the email cannot be sent
+            message_sink.flush()
             email_error(self._name, traceback.format_exc())
+            return False
+
+    def profile_etl(self):
+        profile = profiling.Profile()
+
+        try:
+            with profile:
+                self.do_etl()
+        finally:
+            # A failed report must not fail the ETL
+            try:
+                report = profile.report()
+            except Exception:
+                report = traceback.format_exc()
+
+            self.log('Profile of {}'.format(self._name), attachment=report)
 
     def log_start(self):
         with etl_central_session() as session:
@@ -118,6 +161,7 @@ class EtlStep:
             )
             session.add(self._task)
             session.commit()
+            self._task_id = self._task.id
 
     def log_end(self):
         end_datetime = datetime.datetime.now()
@@ -137,24 +181,83 @@ class EtlStep:
         self.log('Task {} ran for {}'.format(self._name, duration_message))
 
     def log(self, message, attachment=None, log_level='INFO'):
-        with etl_central_session() as session:
-            task = session.merge(self._task)
-            task_message = EtlTaskMessage(
-                etl_task_id=task.id,
+        # Messages can only be recorded against a started task
+        if self._task_id is not None:
+            message_sink.put(
+                etl_task_id=self._task_id,
                 message_datetime=datetime.datetime.now(),
                 message_type=log_level,
                 message=message,
                 attachment=attachment,
             )
-            session.add(task_message)
-            session.commit()
-        
+
         level = getattr(logging, log_level.upper())
         logging.log(level, '{}: {}'.format(self._name, message))
 
     def do_etl(self):
         pass
 
+    def resources(self):
+        """The hosts and temporary disk space that the step uses,
+        which it waits for before it starts.  Steps that run other
+        steps should not declare the resources of those steps.
+        """
+        return Resources()
+
+    def run_steps(self, steps, workers):
+        """Runs steps in parallel, longest first by their recent
+        durations, so that the longest are not left until last.
+        Steps that have not completed recently are started first,
+        as they may be the longest.  The result and duration of
+        each step is logged against this task.
+        """
+        durations = task_durations([s._name for s in steps])
+        steps = sorted(steps, key=lambda s: -durations.get(s._name, float('inf')))
+
+        self.log(
+            'Running {} steps with {} workers'.format(len(steps), workers),
+            attachment='\n'.join('{}: {}'.format(s._name, _expected(durations.get(s._name))) for s in steps),
+        )
+
+        def run(step):
+            start = time.monotonic()
+            succeeded = step.run()
+            return succeeded, time.monotonic() - start
+
+        failed = []
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run, s): s for s in steps}
+
+            for f in as_completed(futures):
+                step = futures[f]
+
+                try:
+                    succeeded, seconds = f.result()
+                except Exception:
+                    succeeded, seconds = False, None
+                    logging.error(traceback.format_exc())
+
+                if not succeeded:
+                    failed.append(step._name)
+
+                self.log(
+                    'Step {} {}{}'.format(
+                        step._name,
+                        'completed' if succeeded else 'FAILED',
+                        '' if seconds is None else ' in {:.0f} seconds'.format(seconds),
+                    ),
+                    log_level='INFO' if succeeded else 'ERROR',
+                )
+
+        if failed:
+            self.log(
+                '{} of {} steps failed: {}'.format(len(failed), len(steps), ', '.join(failed)),
+                log_level='ERROR',
+            )
+
+        return not failed
+
 
 class Etl(EtlStep):
     def __init__(self, name=None, schedule=None):
@@ -236,6 +339,33 @@ class SeleniumEtl(Etl):
             logging.info("get_file_content executed successfully")
 
 
+def task_durations(names):
+    """Gets the median duration in seconds of the recently
+    completed runs of each of the named tasks.
+    """
+    since = datetime.datetime.now() - datetime.timedelta(days=DURATION_HISTORY_DAYS)
+    durations = {}
+
+    with etl_central_session() as session:
+        tasks = session.query(EtlTask.name, EtlTask.start_datetime, EtlTask.end_datetime).filter(
+            EtlTask.name.in_(names),
+            EtlTask.start_datetime >= since,
+            EtlTask.end_datetime.isnot(None),
+        )
+
+        for name, start, end in tasks:
+            durations.setdefault(name, []).append((end - start).total_seconds())
+
+    return {n: statistics.median(d) for n, d in durations.items()}
+
+
+def _expected(seconds):
+    if seconds is None:
+        return 'no recent runs'
+
+    return 'expected {:.0f} minutes'.format(seconds / 60)
+
+
 def get_concrete_etls(cls=None):
     if (cls is None):
         cls = Etl
@@ -1,13 +1,24 @@
 """Database context manager
 """
+import atexit
+import logging
+import threading
+import time
 import pyodbc
 from sqlalchemy import create_engine
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from contextlib import contextmanager
 from sqlalchemy.ext.declarative import declarative_base
 from api.environment import (
     ETL_CENTRAL_CONNECTION_STRING,
     DATABASE_ECHO,
+    DATABASE_POOL_SIZE,
+    DATABASE_MAX_OVERFLOW,
+    DATABASE_POOL_TIMEOUT,
+    DATABASE_POOL_RECYCLE,
+    DATABASE_POOL_PRE_PING,
     MS_SQL_UHL_DWH_HOST,
     MS_SQL_UHL_DWH_USER,
     MS_SQL_UHL_DWH_PASSWORD,
@@ -19,11 +30,139 @@ from api.environment import (
 
 Base = declarative_base()
 
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+class PoolStatistics():
+    """Counts of the connections checked out of a pool and the
+    time spent waiting for them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+
+class TimedQueuePool(QueuePool):
+    """A QueuePool that records how long each checkout waits"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statistics = PoolStatistics()
+
+    def _do_get(self):
+        start = time.monotonic()
+
+        try:
+            result = super()._do_get()
+        except:
+            self.statistics.record(time.monotonic() - start, timed_out=True)
+            raise
+
+        self.statistics.record(time.monotonic() - start)
+        return result
+
+    def recreate(self):
+        # Keep the statistics when the engine is disposed
+        result = super().recreate()
+        result.statistics = self.statistics
+        return result
+
+
+def get_engine(connection_string):
+    """Gets the engine for a connection string, which is shared by
+    all threads in the process, so that connections are reused
+    from its pool rather than opened for each use.
+    """
+    with _engines_lock:
+        if connection_string not in _engines:
+            if make_url(connection_string).get_backend_name() == 'sqlite':
+                _engines[connection_string] = create_engine(connection_string, echo=DATABASE_ECHO)
+            else:
+                _engines[connection_string] = create_engine(
+                    connection_string,
+                    echo=DATABASE_ECHO,
+                    poolclass=TimedQueuePool,
+                    pool_size=DATABASE_POOL_SIZE,
+                    max_overflow=DATABASE_MAX_OVERFLOW,
+                    pool_timeout=DATABASE_POOL_TIMEOUT,
+                    pool_recycle=DATABASE_POOL_RECYCLE,
+                    pool_pre_ping=DATABASE_POOL_PRE_PING,
+                )
+
+        return _engines[connection_string]
+
+
+def pool_statistics():
+    """Gets the state of each engine's pool, keyed by
+    its URL with the password hidden.
+    """
+    with _engines_lock:
+        engines = list(_engines.values())
+
+    result = {}
+
+    for e in engines:
+        pool = e.pool
+        details = {'status': pool.status()}
+
+        statistics = getattr(pool, 'statistics', None)
+
+        if statistics:
+            details.update(
+                checkouts=statistics.checkouts,
+                timeouts=statistics.timeouts,
+                wait_seconds=statistics.wait_seconds,
+                max_wait_seconds=statistics.max_wait_seconds,
+            )
+
+        result[repr(e.url)] = details
+
+    return result
+
+
+def log_pool_statistics():
+    for url, details in pool_statistics().items():
+        if 'checkouts' in details:
+            logging.info('{}: {}; {:,} checkouts, {:,} timeouts, waited {:.1f} seconds (longest {:.1f} seconds)'.format(
+                url,
+                details['status'],
+                details['checkouts'],
+                details['timeouts'],
+                details['wait_seconds'],
+                details['max_wait_seconds'],
+            ))
+        else:
+            logging.info('{}: {}'.format(url, details['status']))
+
+
+@atexit.register
+def dispose_engines():
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+
+    for e in engines:
+        e.dispose()
+
 
 @contextmanager
 def etl_central_session():
-    engine = create_engine(ETL_CENTRAL_CONNECTION_STRING, echo=DATABASE_ECHO)
-    session_maker = sessionmaker(bind=engine)
+    session_maker = sessionmaker(bind=get_engine(ETL_CENTRAL_CONNECTION_STRING))
     session = session_maker()
 
     try:
@@ -36,8 +175,6 @@ def etl_central_session():
     else:
         session.commit()
         session.close()
-    finally:
-        engine.dispose
 
 
 @contextmanager
@@ -61,22 +198,17 @@ def brc_dwh_cursor(database=None):
 @contextmanager
 def uhl_dwh_databases_engine():
     connectionstring = f'mssql+pyodbc://{MS_SQL_UHL_DWH_USER}:{MS_SQL_UHL_DWH_PASSWORD}@{MS_SQL_UHL_DWH_HOST}/dwbriccs?driver={MS_SQL_ODBC_DRIVER.replace(" ", "+")}'
-    engine = create_engine(connectionstring, echo=DATABASE_ECHO)
-    yield engine
-    engine.dispose()
+    yield get_engine(connectionstring)
 
 
 @contextmanager
 def engine(connection_string):
-    engine = create_engine(connection_string, echo=DATABASE_ECHO)
-    yield engine
-    engine.dispose()
+    yield get_engine(connection_string)
 
 @contextmanager
 def connection(connection_string):
-    engine = create_engine(connection_string, echo=DATABASE_ECHO)
-    connection = engine.connect()
+    connection = get_engine(connection_string).connect()
     try:
-        yield engine
+        yield connection
     finally:
         connection.close()
@@ -0,0 +1,99 @@
+"""Adaptive batch sizing
+"""
+
+# How far each batch size moves towards the size that would
+# have taken the target time, and the most it can change by
+SMOOTHING = 0.5
+MAX_GROWTH = 2.0
+
+
+def row_bytes(row):
+    """Approximate size of a row read from the source database"""
+    return sum(len(v) if isinstance(v, (str, bytes)) else 8 for v in row)
+
+
+class BatchSizer():
+    """Groups rows into batches limited by both a number of rows
+    and a number of bytes, and adjusts the number of rows from
+    the time taken to execute each batch, so that batches take
+    about `target_seconds`.
+
+    Narrow rows are sent in larger batches, so that fewer round
+    trips are made, and the byte limit stops wide rows making very
+    large statements.
+    """
+
+    def __init__(self, initial_rows=500, min_rows=10, max_rows=10000, max_bytes=4 * 1024 * 1024, target_seconds=2.0):
+        self.rows = initial_rows
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.target_seconds = target_seconds
+
+        self.batch_count = 0
+        self.total_rows = 0
+        self.total_bytes = 0
+        self.total_seconds = 0.0
+        self.smallest = None
+        self.largest = 0
+
+    def batches(self, rows, size=len):
+        """Yields lists of `rows` with their size in bytes, given
+        by `size`.  Each list ends when it reaches the row limit
+        at the time, or when the next row would take it over the
+        byte limit.
+        """
+        batch = []
+        batch_bytes = 0
+
+        for row in rows:
+            row_size = size(row)
+
+            if batch and (len(batch) >= self.rows or batch_bytes + row_size > self.max_bytes):
+                yield batch, batch_bytes
+                batch = []
+                batch_bytes = 0
+
+            batch.append(row)
+            batch_bytes += row_size
+
+        if batch:
+            yield batch, batch_bytes
+
+    def record(self, rows, batch_bytes, seconds):
+        """Records the time taken to execute a batch and adjusts
+        the number of rows in the following batches.
+        """
+        self.batch_count += 1
+        self.total_rows += rows
+        self.total_bytes += batch_bytes
+        self.total_seconds += seconds
+        self.smallest = min(rows, self.smallest or rows)
+        self.largest = max(rows, self.largest)
+
+        if seconds > 0:
+            ideal = rows * self.target_seconds / seconds
+        else:
+            ideal = self.rows * MAX_GROWTH
+
+        adjusted = self.rows + (ideal - self.rows) * SMOOTHING
+        adjusted = min(max(adjusted, self.rows / MAX_GROWTH), self.rows * MAX_GROWTH)
+
+        self.rows = int(min(max(adjusted, self.min_rows), self.max_rows))
+
+    def summary(self):
+        if not self.batch_count:
+            return 'no batches'
+
+        seconds = self.total_seconds or 1e-9
+
+        return '{:,} rows in {:,} batches of {:,} to {:,} rows (next {:,}), {:,.1f} MB, {:,.0f} rows/second, {:,.2f} MB/second'.format(
+            self.total_rows,
+            self.batch_count,
+            self.smallest,
+            self.largest,
+            self.rows,
+            self.total_bytes / 1e6,
+            self.total_rows / seconds,
+            self.total_bytes / 1e6 / seconds,
+        )
@@ -0,0 +1,236 @@
+"""Bulk load file generation and loading
+"""
+import argparse
+import datetime
+import subprocess
+import sys
+from decimal import Decimal
+
+# Multi-character terminators, as single characters such
+# as tab or comma appear all over free text columns
+FIELD_TERMINATOR = '|~|'
+ROW_TERMINATOR = '|~~|\n'
+
+FORMAT_FILE_VERSION = '14.0'
+
+# In bcp character format an empty field is NULL and
+# a single NUL character is an empty string
+EMPTY_STRING = '\0'
+
+
+class BulkFormatError(Exception):
+    pass
+
+
+def format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        if not value:
+            return EMPTY_STRING
+        # Terminators are matched left to right, so a value that
+        # starts or ends with part of one is as ambiguous as one
+        # that contains a whole terminator
+        if '|~' in value or '~|' in value:
+            raise BulkFormatError('Value contains a bulk file terminator')
+        return value
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+
+    return format_value(str(value))
+
+
+def write_data_file(batches, data_file):
+    """Writes batches of row tuples to a character format
+    data file and returns the number of rows written.
+    """
+    rows = 0
+
+    for batch in batches:
+        for row in batch:
+            data_file.write(FIELD_TERMINATOR.join(format_value(v) for v in row))
+            data_file.write(ROW_TERMINATOR)
+
+        rows += len(batch)
+
+    return rows
+
+
+def _escape_terminator(terminator):
+    return terminator.replace('\\', '\\\\').replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
+
+
+def write_format_file(columns, format_file):
+    """Writes a non-XML bcp format file describing a data
+    file written by `write_data_file`.
+    """
+    format_file.write('{}\n'.format(FORMAT_FILE_VERSION))
+    format_file.write('{}\n'.format(len(columns)))
+
+    for i, c in enumerate(columns, 1):
+        terminator = ROW_TERMINATOR if i == len(columns) else FIELD_TERMINATOR
+
+        format_file.write('{}\tSQLCHAR\t0\t0\t"{}"\t{}\t{}\t""\n'.format(
+            i,
+            _escape_terminator(terminator),
+            i,
+            c,
+        ))
+
+
+def read_format_file(format_file):
+    """Returns the column names and terminators from a
+    format file written by `write_format_file`.
+    """
+    format_file.readline()
+    column_count = int(format_file.readline())
+
+    result = []
+
+    for _ in range(column_count):
+        fields = format_file.readline().rstrip('\n').split('\t')
+        terminator = fields[4].strip('"').encode('latin1').decode('unicode_escape')
+        result.append((fields[6], terminator))
+
+    return result
+
+
+def check_files(format_path, data_path):
+    """Checks that every row in the data file has the
+    columns described by the format file and returns the
+    number of rows.
+    """
+    with open(format_path, encoding='utf-8') as f:
+        columns = read_format_file(f)
+
+    with open(data_path, encoding='utf-8', newline='') as f:
+        data = f.read()
+
+    row_terminator = columns[-1][1]
+
+    if data and not data.endswith(row_terminator):
+        raise BulkFormatError('Data file does not end with the row terminator')
+
+    rows = data.split(row_terminator)[:-1]
+
+    for i, row in enumerate(rows, 1):
+        fields = row.split(columns[0][1])
+
+        if len(fields) != len(columns):
+            raise BulkFormatError('Row {} has {} fields but {} columns are defined'.format(
+                i,
+                len(fields),
+                len(columns),
+            ))
+
+    return len(rows)
+
+
+class BulkLoadCommand():
+    """Loads a table from a data file and its format file by
+    running an external command.
+
+    Arguments in the command may contain the placeholders
+    `{database}`, `{table}`, `{data_file}` and `{format_file}`.
+    """
+
+    def __init__(self, command):
+        self.command = command
+
+    def __call__(self, database, table, data_file, format_file):
+        result = subprocess.run(
+            [
+                a.format(database=database, table=table, data_file=data_file, format_file=format_file)
+                for a in self.command
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+        )
+
+        if result.returncode != 0:
+            raise BulkFormatError('Bulk load of {} failed: {}'.format(table, result.stdout))
+
+        return result.stdout
+
+
+def bcp_command(host, user, password, batch_size=100000):
+    """A minimally logged bcp load into an empty table
+    """
+    return BulkLoadCommand([
+        'bcp',
+        '[{database}].[dbo].[{table}]',
+        'in',
+        '{data_file}',
+        '-f',
+        '{format_file}',
+        '-S',
+        host,
+        '-U',
+        user,
+        '-P',
+        password,
+        '-C',
+        '65001',
+        '-b',
+        str(batch_size),
+        '-k',
+        '-h',
+        'TABLOCK',
+    ])
+
+
+class BulkInsertLoader():
+    """Loads a table with T-SQL BULK INSERT using cursors from
+    `cursor_factory`.  The files must be readable by SQL Server,
+    so `server_directory` is the directory holding the files as
+    seen by the server.
+    """
+
+    def __init__(self, cursor_factory, server_directory):
+        self.cursor_factory = cursor_factory
+        self.server_directory = server_directory.rstrip('\\/')
+
+    def __call__(self, database, table, data_file, format_file):
+        with self.cursor_factory() as cursor:
+            cursor.execute('''
+                BULK INSERT [{database}].[dbo].[{table}]
+                FROM '{directory}\\{data_file}'
+                WITH (
+                    FORMATFILE = '{directory}\\{format_file}',
+                    CODEPAGE = '65001',
+                    KEEPNULLS,
+                    TABLOCK
+                );
+            '''.format(
+                database=database,
+                table=table,
+                directory=self.server_directory,
+                data_file=data_file.replace('\\', '/').split('/')[-1],
+                format_file=format_file.replace('\\', '/').split('/')[-1],
+            ))
+
+
+if __name__ == '__main__':
+    # Arguments match those given to a BulkLoadCommand, so this
+    # can stand in for bcp when there is no SQL Server to hand
+    parser = argparse.ArgumentParser(description='Check a bulk load data file against its format file.')
+    parser.add_argument('database')
+    parser.add_argument('table')
+    parser.add_argument('data_file')
+    parser.add_argument('format_file')
+    args = parser.parse_args()
+
+    try:
+        print('{}: {:,} rows'.format(args.table, check_files(args.format_file, args.data_file)))
+    except BulkFormatError as e:
+        print('{}: {}'.format(args.table, e), file=sys.stderr)
+        sys.exit(1)
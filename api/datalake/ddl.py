@@ -0,0 +1,220 @@
+"""MySQL to MS SQL DDL generation
+"""
+import re
+from collections import namedtuple
+from api.datalake.inserts import ZERO_DATES
+
+# Change when the translation changes, so that
+# DDL translated by earlier versions is not reused
+TRANSLATOR_VERSION = 3
+
+Ddl = namedtuple('DDL', ['creates', 'indexes', 'foreign_keys'])
+
+# MySQL column types that have to be changed for MS SQL.  Any
+# length or values given with the MySQL type are dropped.
+# Types not listed are passed through unchanged.
+TYPE_MAPPINGS = {
+    'tinyint': 'TINYINT',
+    'smallint': 'SMALLINT',
+    'mediumint': 'INT',
+    'int': 'INT',
+    'integer': 'INT',
+    'bigint': 'BIGINT',
+    'double': 'FLOAT(53)',
+    'bit': 'BIT',
+    'year': 'SMALLINT',
+    'tinyblob': 'varbinary(max)',
+    'mediumblob': 'varbinary(max)',
+    'longblob': 'varbinary(max)',
+    'blob': 'varchar(max)',
+    'tinytext': 'varchar(max)',
+    'mediumtext': 'varchar(max)',
+    'longtext': 'varchar(max)',
+    'text': 'varchar(max)',
+    'json': 'varchar(max)',
+    # datetime2 has a range that matches MySQL
+    'datetime': 'datetime2',
+    'timestamp': 'datetime2',
+    'enum': 'varchar(255)',
+    'set': 'varchar(255)',
+}
+
+# MySQL types that can hold zero dates.  Zero dates are loaded as
+# NULL, so columns of these types are created nullable unless they
+# are part of the primary key.
+DATE_TYPES = ('date', 'datetime', 'timestamp')
+
+# MySQL column type attributes that MS SQL does not have
+_TYPE_ATTRIBUTES = re.compile(r'\s+(?:unsigned|zerofill)\b', re.IGNORECASE)
+
+# MySQL index types that MS SQL has no equivalent
+# for that can be created this way
+SKIPPED_INDEX_TYPES = ('FULLTEXT', 'SPATIAL')
+
+PRIMARY_KEY = 'PRIMARY'
+
+# The table altered by an index or foreign key statement
+# written by DdlGenerator
+_ALTERED_TABLE = re.compile(r'''^(?:CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:"(?:[^"]|"")*"|\S+)\s+ON|ALTER\s+TABLE)\s+("(?:[^"]|"")*"|[^\s(]+)''')
+
+
+def _unquote(identifier):
+    return identifier.strip('"')
+
+
+def _quote(identifier):
+    return '"{}"'.format(identifier.replace('"', '""'))
+
+
+def _grouped(rows, *fields):
+    """Groups rows by the values of `fields`, keeping the order
+    that the groups and the rows within them are found in.
+    """
+    result = {}
+
+    for r in rows:
+        result.setdefault(tuple(getattr(r, f) for f in fields), []).append(r)
+
+    return result
+
+
+def statements_by_table(lines):
+    """Groups the index or foreign key statements written by
+    DdlGenerator, one a line, by the table that they alter,
+    keeping them in order.
+    """
+    result = {}
+
+    for line in lines:
+        statement = line.strip()
+
+        if not statement:
+            continue
+
+        m = _ALTERED_TABLE.match(statement)
+        table = _unquote(m.group(1)) if m else None
+
+        result.setdefault(table, []).append(statement)
+
+    return result
+
+
+class DdlGenerator():
+    """Writes the MS SQL DDL for a MySQL database from the column,
+    index and foreign key definitions read from its
+    information_schema.
+
+    The schema is read with the same queries as the schema's
+    fingerprint, so no mysqldump process or parsing is needed.
+    """
+
+    def __init__(self, keys_to_ignore=None, constraints_to_ignore=None):
+        self.keys_to_ignore = set(keys_to_ignore or [])
+        self.constraints_to_ignore = set(constraints_to_ignore or [])
+
+    def generate(self, schema, tables, ddl):
+        """Writes the DDL for `tables` from `schema`, as read by
+        `source.read_schema`, into the `creates`, `indexes` and
+        `foreign_keys` file-like objects of `ddl`.
+        """
+        loaded = set(tables)
+        columns = _grouped(schema.columns, 'table')
+        indexes = _grouped(schema.indexes, 'table', 'name')
+        foreign_keys = _grouped(
+            [c for c in schema.constraints if c.referenced_table is not None],
+            'table',
+            'name',
+        )
+
+        for t in tables:
+            primary_key = indexes.get((t, PRIMARY_KEY), [])
+            ddl.creates.write(self.create_table(t, columns.get((t,), []), primary_key))
+
+        for (t, name), index in indexes.items():
+            if t not in loaded or name == PRIMARY_KEY or name in self.keys_to_ignore:
+                continue
+
+            if index[0].index_type.upper() in SKIPPED_INDEX_TYPES:
+                continue
+
+            ddl.indexes.write('CREATE {}INDEX {} ON {} ({});\n'.format(
+                '' if int(index[0].non_unique) else 'UNIQUE ',
+                _quote(name),
+                _quote(t),
+                ','.join(_quote(i.column) for i in index),
+            ))
+
+        for (t, name), key in foreign_keys.items():
+            if t not in loaded or name in self.constraints_to_ignore:
+                continue
+
+            # A foreign key to a table that is not loaded
+            # could not be created
+            if key[0].referenced_table not in loaded:
+                continue
+
+            ddl.foreign_keys.write('ALTER TABLE {} ADD CONSTRAINT {} FOREIGN KEY ({}) REFERENCES {} ({});\n'.format(
+                _quote(t),
+                _quote(name),
+                ','.join(_quote(k.column) for k in key),
+                _quote(key[0].referenced_table),
+                ','.join(_quote(k.referenced_column) for k in key),
+            ))
+
+        return tables
+
+    def create_table(self, table, columns, primary_key):
+        keys = {p.column for p in primary_key}
+        definitions = [self.column_definition(c, c.name in keys) for c in columns]
+
+        if primary_key:
+            definitions.append('PRIMARY KEY ({})'.format(','.join(_quote(p.column) for p in primary_key)))
+
+        return 'CREATE TABLE {} (\n{}\n);\n'.format(
+            _quote(table),
+            ',\n'.join('  ' + d for d in definitions),
+        )
+
+    def column_definition(self, column, primary_key=False):
+        data_type = column.column_type.split('(')[0].split()[0].lower()
+
+        result = '{} {}'.format(
+            _quote(column.name),
+            TYPE_MAPPINGS.get(data_type) or _TYPE_ATTRIBUTES.sub('', column.column_type),
+        )
+
+        nullable = column.is_nullable == 'YES' or (data_type in DATE_TYPES and not primary_key)
+
+        if not nullable:
+            result += ' NOT NULL'
+
+        default = self.default(column, nullable)
+
+        if default is not None:
+            result += ' DEFAULT ' + default
+
+        return result
+
+    def default(self, column, nullable):
+        """The column's default as T-SQL, from the value given by
+        MySQL, which MariaDB gives as a literal
+        """
+        value = column.default
+
+        if value is None or value.upper() == 'NULL' or value.strip("'") in ZERO_DATES:
+            return 'NULL' if nullable else None
+
+        if value.lower().startswith('current_timestamp'):
+            return 'CURRENT_TIMESTAMP'
+
+        # Other expressions cannot be translated
+        if 'DEFAULT_GENERATED' in (column.extra or '').upper():
+            return None
+
+        if len(value) > 2 and value[0] in 'bB' and value[1] == "'":
+            value = value[1:]
+
+        if value.startswith("'") and value.endswith("'") and len(value) > 1:
+            return value
+
+        return "'{}'".format(value.replace("'", "''"))
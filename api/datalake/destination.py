@@ -0,0 +1,550 @@
+"""Datalake destination databases
+"""
+import datetime
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+
+SQL_DROP_DB = '''
+IF EXISTS (SELECT name FROM sys.databases WHERE name = N'{0}')
+BEGIN
+    ALTER DATABASE [{0}] SET SINGLE_USER WITH ROLLBACK IMMEDIATE;
+    DROP DATABASE [{0}];
+END
+'''
+# Databases are renamed when they are swapped in, but their files are
+# not, so the files are given unique names ({1}) to avoid clashing with
+# the files of the database that the last staging database became.
+SQL_CREATE_DB = """
+DECLARE @data NVARCHAR(500) = CONVERT(NVARCHAR(500), SERVERPROPERTY('InstanceDefaultDataPath'));
+DECLARE @log NVARCHAR(500) = CONVERT(NVARCHAR(500), SERVERPROPERTY('InstanceDefaultLogPath'));
+DECLARE @sql NVARCHAR(MAX) = N'CREATE DATABASE [{0}]
+    ON (NAME = N''{0}'', FILENAME = N''' + @data + N'{1}.mdf'')
+    LOG ON (NAME = N''{0}_log'', FILENAME = N''' + @log + N'{1}_log.ldf'');';
+EXEC (@sql);
+"""
+SQL_RENAME_DB = '''
+IF EXISTS (SELECT name FROM sys.databases WHERE name = N'{0}')
+BEGIN
+    ALTER DATABASE [{0}] SET SINGLE_USER WITH ROLLBACK IMMEDIATE;
+    ALTER DATABASE [{0}] MODIFY NAME = [{1}];
+    ALTER DATABASE [{1}] SET MULTI_USER;
+END
+'''
+SQL_SIMPLE_RECOVERY = '''
+ALTER DATABASE [{0}] SET RECOVERY SIMPLE;
+'''
+SQL_DATABASE_EXISTS = '''
+SELECT COUNT(*) FROM sys.databases WHERE name = ?;
+'''
+# Run before creating indexes and foreign keys when resuming a load,
+# in case the load failed while they were being created, and before
+# emptying a database for reuse
+SQL_DROP_INDEXES_AND_FOREIGN_KEYS = '''
+DECLARE @sql NVARCHAR(MAX) = N'';
+
+SELECT @sql += N'ALTER TABLE ' + QUOTENAME(OBJECT_NAME(parent_object_id)) + N' DROP CONSTRAINT ' + QUOTENAME(name) + N';'
+FROM sys.foreign_keys;
+
+SELECT @sql += N'DROP INDEX ' + QUOTENAME(i.name) + N' ON ' + QUOTENAME(t.name) + N';'
+FROM sys.indexes i
+JOIN sys.tables t ON t.object_id = i.object_id
+WHERE i.type > 0
+    AND i.is_primary_key = 0
+    AND i.is_unique_constraint = 0;
+
+EXEC sp_executesql @sql;
+'''
+SQL_TRUNCATE_TABLES = '''
+EXEC sp_MSforeachtable 'TRUNCATE TABLE ?';
+'''
+SQL_ROW_COUNTS = '''
+SELECT t.name, SUM(p.rows)
+FROM sys.tables t
+JOIN sys.partitions p ON p.object_id = t.object_id
+WHERE p.index_id IN (0, 1)
+GROUP BY t.name;
+'''
+SQL_ROLLBACK = 'IF @@TRANCOUNT > 0 ROLLBACK;'
+SQL_TABLES_NOCHECK_CONSTRAINTS = '''
+EXEC sp_MSforeachtable 'ALTER TABLE ? NOCHECK CONSTRAINT ALL';
+'''
+SQL_TABLES_CHECK_CONSTRAINTS = '''
+EXEC sp_MSforeachtable 'ALTER TABLE ? WITH CHECK CHECK CONSTRAINT ALL';
+'''
+SQL_MERGE = '''
+SET NOCOUNT ON;
+MERGE {table} AS d
+USING {staging} AS i
+ON ({join})
+{update}
+WHEN NOT MATCHED THEN
+    INSERT ({columns}) VALUES ({values});
+'''
+
+SQLSTATE_DEADLOCK = '40001'
+
+# SQLSTATE classes of errors caused by the data in a row:
+# data exceptions and integrity constraint violations
+SQLSTATE_ROW_ERROR_CLASSES = ('22', '23')
+DEADLOCK_RETRIES = 3
+
+
+class Destination():
+    """The database server that a datalake step loads into.
+
+    Databases are created, filled and swapped by name.  Work
+    within a database is done through a cursor from `cursor`,
+    which is passed to the other methods, so that each thread
+    can have its own.  The DDL, index statements and INSERT
+    statements given are T-SQL, as written by DdlGenerator and
+    InsertTranscoder.
+    """
+
+    # Exceptions raised by the database
+    errors = (Exception,)
+
+    def cursor(self, database=None):
+        raise NotImplementedError()
+
+    def database_exists(self, database):
+        raise NotImplementedError()
+
+    def create_database(self, database):
+        """Creates an empty database, dropping any existing one"""
+        raise NotImplementedError()
+
+    def empty_database(self, database):
+        """Deletes the rows, indexes and foreign keys of every table"""
+        raise NotImplementedError()
+
+    def swap(self, loading, destination, keep_old):
+        """Replaces the destination database with the loading database,
+        renaming the replaced database as the loading database when
+        `keep_old`, and dropping it otherwise.
+        """
+        raise NotImplementedError()
+
+    def execute_ddl(self, cursor, ddl):
+        raise NotImplementedError()
+
+    def execute_inserts(self, cursor, inserts, atomic=False):
+        """Runs a batch of INSERT statements in one transaction.
+        When `atomic`, an error rolls back the whole batch.
+        """
+        raise NotImplementedError()
+
+    def load_batch(self, cursor, table, columns, rows):
+        """Inserts rows of values in one transaction"""
+        raise NotImplementedError()
+
+    def create_index(self, cursor, statement):
+        """Runs a CREATE INDEX or ADD CONSTRAINT statement"""
+        raise NotImplementedError()
+
+    def drop_indexes(self, cursor):
+        """Drops the indexes and foreign keys made by create_index"""
+        raise NotImplementedError()
+
+    def rollback(self, cursor):
+        raise NotImplementedError()
+
+    def disable_constraints(self, cursor):
+        """Stops foreign keys being checked while tables are merged"""
+        raise NotImplementedError()
+
+    def enable_constraints(self, cursor):
+        """Checks foreign keys again, validating the rows merged
+        while they were disabled so that the keys stay trusted
+        """
+        raise NotImplementedError()
+
+    def create_staging_table(self, cursor, table):
+        """Creates an empty table like `table`, for the cursor's
+        connection only, and returns its name.
+        """
+        raise NotImplementedError()
+
+    def merge_staging_table(self, cursor, staging, table, columns, key_columns):
+        """Updates the rows of `table` that match a row of the
+        staging table on `key_columns`, and inserts the rest.
+        """
+        raise NotImplementedError()
+
+    def drop_staging_table(self, cursor, staging):
+        cursor.execute('DROP TABLE {};'.format(self.quote(staging)))
+
+    def is_row_error(self, error):
+        """Whether an error is caused by the data in a row, rather
+        than by the connection or the database, so that the rows
+        causing it can be found and quarantined.
+        """
+        return isinstance(error, ValueError)
+
+    def max_value(self, cursor, table, column):
+        cursor.execute('SELECT MAX({}) FROM {};'.format(self.quote(column), self.quote(table)))
+        return cursor.fetchone()[0]
+
+    def delete_rows(self, cursor, table):
+        cursor.execute('DELETE FROM {};'.format(self.quote(table)))
+
+    def row_counts(self, database):
+        raise NotImplementedError()
+
+    def quote(self, identifier):
+        return '"{}"'.format(identifier.replace('"', '""'))
+
+
+class MssqlDestination(Destination):
+    """SQL Server, through cursors from `cursor`, a context
+    manager taking a database name, such as brc_dwh_cursor.
+    """
+
+    def __init__(self, cursor):
+        # Imported here so that other destinations can
+        # be used where pyodbc is not installed
+        import pyodbc
+
+        self.errors = (pyodbc.Error,)
+        self._cursor = cursor
+
+    def cursor(self, database=None):
+        return self._cursor(database=database)
+
+    def database_exists(self, database):
+        with self.cursor() as conn:
+            return conn.execute(SQL_DATABASE_EXISTS, database).fetchval() > 0
+
+    def create_database(self, database):
+        with self.cursor() as conn:
+            conn.execute(SQL_DROP_DB.format(database))
+            conn.execute(SQL_CREATE_DB.format(
+                database,
+                '{}_{:%Y%m%d%H%M%S}'.format(database, datetime.datetime.now()),
+            ))
+            conn.execute(SQL_SIMPLE_RECOVERY.format(database))
+
+    def empty_database(self, database):
+        with self.cursor(database) as conn:
+            conn.execute(SQL_DROP_INDEXES_AND_FOREIGN_KEYS)
+            conn.execute(SQL_TRUNCATE_TABLES)
+
+    def swap(self, loading, destination, keep_old):
+        old = '{}__old'.format(destination)
+
+        with self.cursor() as conn:
+            conn.execute(SQL_DROP_DB.format(old))
+            conn.execute(SQL_RENAME_DB.format(destination, old))
+
+            try:
+                conn.execute(SQL_RENAME_DB.format(loading, destination))
+            except:
+                conn.execute(SQL_RENAME_DB.format(old, destination))
+                raise
+
+            if keep_old:
+                conn.execute(SQL_RENAME_DB.format(old, loading))
+            else:
+                conn.execute(SQL_DROP_DB.format(old))
+
+    def execute_ddl(self, cursor, ddl):
+        cursor.execute(ddl)
+
+    def execute_inserts(self, cursor, inserts, atomic=False):
+        # Placing all inserts in one transaction,
+        # as opposed to an implicit transaction for
+        # each insert, speeds things up
+        cursor.execute(
+            'SET ANSI_WARNINGS OFF\n;' +
+            ('SET XACT_ABORT ON\n' if atomic else '') +
+            'BEGIN TRANSACTION\n' +
+            'SET NOCOUNT ON\n' +
+            inserts +
+            '\nCOMMIT;\n' +
+            'SET ANSI_WARNINGS ON\n;'
+        )
+
+    def load_batch(self, cursor, table, columns, rows):
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            self.quote(table),
+            ', '.join(self.quote(c) for c in columns),
+            ', '.join('?' * len(columns)),
+        )
+
+        cursor.fast_executemany = True
+        cursor.connection.autocommit = False
+
+        try:
+            cursor.executemany(sql, rows)
+            cursor.commit()
+        except:
+            cursor.rollback()
+            raise
+        finally:
+            cursor.connection.autocommit = True
+
+    def create_index(self, cursor, statement):
+        # Foreign keys created at the same time can deadlock
+        for attempt in range(DEADLOCK_RETRIES + 1):
+            try:
+                cursor.execute(statement)
+                return
+            except self.errors as e:
+                if e.args[0] != SQLSTATE_DEADLOCK or attempt == DEADLOCK_RETRIES:
+                    raise
+
+    def drop_indexes(self, cursor):
+        cursor.execute(SQL_DROP_INDEXES_AND_FOREIGN_KEYS)
+
+    def rollback(self, cursor):
+        cursor.execute(SQL_ROLLBACK)
+
+    def disable_constraints(self, cursor):
+        cursor.execute(SQL_TABLES_NOCHECK_CONSTRAINTS)
+
+    def enable_constraints(self, cursor):
+        cursor.execute(SQL_TABLES_CHECK_CONSTRAINTS)
+
+    def create_staging_table(self, cursor, table):
+        staging = '#incremental'
+        cursor.execute('SELECT TOP 0 * INTO {} FROM {};'.format(self.quote(staging), self.quote(table)))
+        return staging
+
+    def merge_staging_table(self, cursor, staging, table, columns, key_columns):
+        updates = [c for c in columns if c not in key_columns]
+
+        cursor.execute(SQL_MERGE.format(
+            table=self.quote(table),
+            staging=self.quote(staging),
+            join=' AND '.join('d.{0} = i.{0}'.format(self.quote(c)) for c in key_columns),
+            update='WHEN MATCHED THEN UPDATE SET {}'.format(
+                ', '.join('d.{0} = i.{0}'.format(self.quote(c)) for c in updates)
+            ) if updates else '',
+            columns=', '.join(self.quote(c) for c in columns),
+            values=', '.join('i.{}'.format(self.quote(c)) for c in columns),
+        ))
+
+    def is_row_error(self, error):
+        if isinstance(error, self.errors):
+            return bool(error.args) and str(error.args[0])[:2] in SQLSTATE_ROW_ERROR_CLASSES
+
+        return super().is_row_error(error)
+
+    def row_counts(self, database):
+        with self.cursor(database) as conn:
+            return {t: int(c) for t, c in conn.execute(SQL_ROW_COUNTS).fetchall()}
+
+    def quote(self, identifier):
+        return '[{}]'.format(identifier.replace(']', ']]'))
+
+
+# T-SQL that SQLite does not accept
+_SQLITE_DDL = [
+    (re.compile(r'\s+COLLATE\s+\w+'), ''),
+    (re.compile(r'\(max\)', re.IGNORECASE), ''),
+    # SQL Server allows a comma after the last definition
+    (re.compile(r',(\s*\)\s*;)'), r'\1'),
+]
+_SQLITE_INSERT = re.compile(r"'(?:[^']|'')*'|(?<=[,(])0x([0-9A-Fa-f]*)(?=[,)])| \+ ")
+
+
+# SQLite index names are unique within the database, rather
+# than the table, so they are prefixed with the table's name
+_SQLITE_INDEX = re.compile(r'''^(CREATE\s+(?:UNIQUE\s+)?INDEX\s+)("(?:[^"]|"")*"|\S+)(\s+ON\s+)("(?:[^"]|"")*"|[^\s(]+)''', re.IGNORECASE)
+
+
+def _sqlite_identifier(identifier):
+    if identifier.startswith('"'):
+        return identifier[1:-1].replace('""', '"')
+
+    return identifier
+
+
+def _sqlite_insert_token(match):
+    if match.group(1) is not None:
+        return "X'{}'".format(match.group(1))
+    if match.group() == ' + ':
+        return ' || '
+    return match.group()
+
+
+class SqliteDestination(Destination):
+    """SQLite databases, as files in `directory` or, without a
+    directory, in memory for as long as this object exists, so
+    that a step can be run and compared without SQL Server.
+
+    SQLite cannot add foreign keys to existing tables, so they
+    are not created.
+    """
+
+    errors = (sqlite3.Error,)
+
+    def __init__(self, directory=None):
+        self.directory = directory
+
+        # In memory databases, by name, with the connection
+        # that keeps each one in existence
+        self._memory = {}
+        self._memory_count = 0
+
+    def _path(self, database):
+        if self.directory:
+            return os.path.join(self.directory, '{}.sqlite'.format(database)), False
+
+        return 'file:{}?mode=memory&cache=shared'.format(self._memory[database][0]), True
+
+    @contextmanager
+    def cursor(self, database=None):
+        path, uri = self._path(database)
+        conn = sqlite3.connect(path, uri=uri, isolation_level=None, check_same_thread=False)
+
+        try:
+            yield conn.cursor()
+        finally:
+            conn.close()
+
+    def database_exists(self, database):
+        if self.directory:
+            return os.path.exists(self._path(database)[0])
+
+        return database in self._memory
+
+    def create_database(self, database):
+        self._drop(database)
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            sqlite3.connect(self._path(database)[0]).close()
+        else:
+            self._memory_count += 1
+            name = 'datalake_{}_{}'.format(id(self), self._memory_count)
+            self._memory[database] = (name, sqlite3.connect('file:{}?mode=memory&cache=shared'.format(name), uri=True))
+
+    def _drop(self, database):
+        if self.directory:
+            if os.path.exists(self._path(database)[0]):
+                os.remove(self._path(database)[0])
+        elif database in self._memory:
+            self._memory.pop(database)[1].close()
+
+    def _rename(self, old, new):
+        if self.directory:
+            os.replace(self._path(old)[0], self._path(new)[0])
+        else:
+            self._memory[new] = self._memory.pop(old)
+
+    def empty_database(self, database):
+        with self.cursor(database) as cursor:
+            self.drop_indexes(cursor)
+
+            for t in self._tables(cursor):
+                self.delete_rows(cursor, t)
+
+    def swap(self, loading, destination, keep_old):
+        old = '{}__old'.format(destination)
+
+        self._drop(old)
+
+        if self.database_exists(destination):
+            self._rename(destination, old)
+
+        self._rename(loading, destination)
+
+        if keep_old and self.database_exists(old):
+            self._rename(old, loading)
+        else:
+            self._drop(old)
+
+    def execute_ddl(self, cursor, ddl):
+        for pattern, replacement in _SQLITE_DDL:
+            ddl = pattern.sub(replacement, ddl)
+
+        cursor.executescript(ddl)
+
+    def execute_inserts(self, cursor, inserts, atomic=False):
+        inserts = _SQLITE_INSERT.sub(_sqlite_insert_token, inserts)
+
+        try:
+            cursor.executescript('BEGIN;\n' + inserts + '\nCOMMIT;')
+        except self.errors:
+            self.rollback(cursor)
+            raise
+
+    def load_batch(self, cursor, table, columns, rows):
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            self.quote(table),
+            ', '.join(self.quote(c) for c in columns),
+            ', '.join('?' * len(columns)),
+        )
+
+        cursor.execute('BEGIN')
+
+        try:
+            cursor.executemany(sql, rows)
+            cursor.execute('COMMIT')
+        except:
+            self.rollback(cursor)
+            raise
+
+    def create_index(self, cursor, statement):
+        if statement.upper().startswith('ALTER TABLE'):
+            return
+
+        m = _SQLITE_INDEX.match(statement)
+
+        if m:
+            name = '{}__{}'.format(_sqlite_identifier(m.group(4)), _sqlite_identifier(m.group(2)))
+            statement = m.group(1) + self.quote(name) + m.group(3) + m.group(4) + statement[m.end():]
+
+        cursor.execute(statement)
+
+    def drop_indexes(self, cursor):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")
+
+        for name, in cursor.fetchall():
+            cursor.execute('DROP INDEX {}'.format(self.quote(name)))
+
+    def rollback(self, cursor):
+        if cursor.connection.in_transaction:
+            cursor.execute('ROLLBACK')
+
+    def disable_constraints(self, cursor):
+        # Foreign keys are not created
+        pass
+
+    def enable_constraints(self, cursor):
+        pass
+
+    def create_staging_table(self, cursor, table):
+        # Temporary tables are found before the database's
+        # own tables of the same name
+        staging = '{}__incremental'.format(table)
+        cursor.execute('CREATE TEMP TABLE {} AS SELECT * FROM {} WHERE 0;'.format(self.quote(staging), self.quote(table)))
+        return staging
+
+    def merge_staging_table(self, cursor, staging, table, columns, key_columns):
+        updates = [c for c in columns if c not in key_columns]
+
+        # The WHERE clause is needed for SQLite to
+        # parse the upsert after a SELECT
+        cursor.execute('INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} WHERE 1 ON CONFLICT ({keys}) {action};'.format(
+            table=self.quote(table),
+            staging=self.quote(staging),
+            columns=', '.join(self.quote(c) for c in columns),
+            keys=', '.join(self.quote(c) for c in key_columns),
+            action='DO UPDATE SET {}'.format(
+                ', '.join('{0} = excluded.{0}'.format(self.quote(c)) for c in updates)
+            ) if updates else 'DO NOTHING',
+        ))
+
+    def is_row_error(self, error):
+        return isinstance(error, (sqlite3.IntegrityError, sqlite3.DataError)) or super().is_row_error(error)
+
+    def row_counts(self, database):
+        with self.cursor(database) as cursor:
+            return {t: cursor.execute('SELECT COUNT(*) FROM {}'.format(self.quote(t))).fetchone()[0] for t in self._tables(cursor)}
+
+    def _tables(self, cursor):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+        return [r[0] for r in cursor.fetchall()]
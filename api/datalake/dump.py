@@ -0,0 +1,114 @@
+"""mysqldump output streaming
+"""
+import queue
+import subprocess
+import threading
+from tempfile import TemporaryFile
+
+
+class DumpError(Exception):
+    pass
+
+
+class DumpStream():
+    """Runs a dump command and hands its output over in batches of
+    lines.
+
+    A background thread reads the process's stdout into a bounded
+    queue, so that the consumer can load one batch while the next is
+    being dumped.  At most `max_batches` batches are held in memory.
+    When the context exits the process's exit code is checked and its
+    stderr made available in `errors`.
+    """
+
+    _END = object()
+
+    def __init__(self, command, batch_size=500, max_batches=8):
+        self.command = command
+        self.batch_size = batch_size
+        self.errors = []
+
+        self._queue = queue.Queue(maxsize=max_batches)
+        self._stop = threading.Event()
+        self._exception = None
+
+    def __enter__(self):
+        self._errors_file = TemporaryFile(mode='w+t')
+
+        self._process = subprocess.Popen(
+            self.command,
+            stdout=subprocess.PIPE,
+            stderr=self._errors_file,
+            universal_newlines=True,
+        )
+
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._stop.set()
+
+        if exc_type is not None:
+            self._process.kill()
+
+        self._thread.join()
+        self._process.stdout.close()
+        returncode = self._process.wait()
+
+        self._errors_file.seek(0)
+        self.errors = [e.rstrip('\n') for e in self._errors_file if e.strip()]
+        self._errors_file.close()
+
+        if exc_type is not None:
+            return False
+
+        if self._exception is not None:
+            raise self._exception
+
+        if returncode != 0:
+            raise DumpError('{} exited with code {}: {}'.format(
+                self.command[0],
+                returncode,
+                '\n'.join(self.errors),
+            ))
+
+    def __iter__(self):
+        while True:
+            batch = self._queue.get()
+
+            if batch is self._END:
+                return
+
+            yield batch
+
+    def _produce(self):
+        try:
+            batch = []
+
+            for line in self._process.stdout:
+                batch.append(line)
+
+                if len(batch) >= self.batch_size:
+                    if not self._put(batch):
+                        return
+                    batch = []
+
+            if batch:
+                self._put(batch)
+
+        except Exception as e:
+            self._exception = e
+        finally:
+            self._put(self._END)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+
+        return False
@@ -0,0 +1,247 @@
+"""mysqldump INSERT statement transcoding
+"""
+import re
+
+ZERO_DATES = {'0000-00-00', '0000-00-00 00:00:00'}
+
+# MySQL string escapes and the characters they represent.  Any
+# other escaped character represents itself.
+ESCAPES = {
+    '0': '\0',
+    "'": "''",
+    '"': '"',
+    'b': '\b',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+    'Z': '\x1a',
+    '\\': '\\',
+    '%': '%',
+    '_': '_',
+}
+
+# Characters that cannot be written as they are in a T-SQL
+# literal.  NUL cannot be sent, and a backslash followed by a
+# line break is a line continuation in T-SQL.
+_UNWRITABLE = re.compile(r'\0|\\(?=[\r\n])')
+
+# mysqldump writes each statement on one line, with line breaks
+# in values escaped, and always escapes quotes in values with a
+# backslash.  Lines that contain none of these only need zero
+# dates replacing, which can only appear as whole values in the
+# VALUES list.
+_SPECIAL = re.compile(r'\\|/\*|^--|^DELIMITER', re.MULTILINE)
+_ZERO_DATE = re.compile(r"(?<=[,(])'0000-00-00(?: 00:00:00)?'(?=[,)])")
+
+_NORMAL = re.compile(r'''(?P<plain>'[^'\\\n]*'(?!'))|['"]|/\*''')
+_LITERAL = re.compile(r"['\\]")
+
+# Batches made up only of ordinary INSERT statements, one a line,
+# are converted by a single substitution over their identifiers and
+# literals.  Anything else - a comment, a literal that does not end
+# on its line or a quote doubled in MySQL's way - stops the
+# substitution and the batch is converted by the state machine.
+# Each statement up to its values is matched whole where it has
+# mysqldump's usual form, to keep the substitutions to a minimum.
+_UNUSUAL_LINE = re.compile(r'\n(?!INSERT INTO |$)')
+_IDENTIFIER = r'"[^"\n]*(?:""[^"\n]*)*"'
+_ORDINARY = re.compile(r'''(INSERT INTO {0}(?: \((?:{0}(?:, ?)?)*\))? VALUES \(|{0})|'([^'\\\n]*(?:\\.[^'\\\n]*)*)'(?!')|['"]|/\*'''.format(_IDENTIFIER))
+_ESCAPE = re.compile(r'\\(.)', re.DOTALL)
+
+NORMAL = 'normal'
+LITERAL = 'literal'
+IDENTIFIER = 'identifier'
+COMMENT = 'comment'
+
+
+def _write_unwritable(match):
+    if match.group() == '\0':
+        return "' + CHAR(0) + '"
+    return "\\' + '"
+
+
+def _literal(text):
+    if text in ZERO_DATES:
+        # MySQL uses '0000-00-00' for NULL dates and
+        # '0000-00-00 00:00:00' for NULL datetimes
+        return 'NULL'
+
+    if '\\' in text or '\0' in text:
+        text = _UNWRITABLE.sub(_write_unwritable, text)
+
+    return "'" + text + "'"
+
+
+def _unescape(match):
+    escaped = match.group(1)
+    return ESCAPES.get(escaped, escaped)
+
+
+class _Unusual(Exception):
+    pass
+
+
+def _ordinary_token(match):
+    text = match.group(2)
+
+    if text is None:
+        if match.group(1) is None:
+            raise _Unusual()
+
+        return match.group(1)
+
+    if '\\' in text:
+        return _literal(_ESCAPE.sub(_unescape, text))
+
+    return 'NULL' if text in ZERO_DATES else match.group()
+
+
+def _replace_zero_dates(text):
+    if '0000-00-00' in text:
+        return _ZERO_DATE.sub('NULL', text)
+    return text
+
+
+class InsertTranscoder():
+    """Converts INSERT statements output by mysqldump into T-SQL
+    in a single pass.
+
+    MySQL string escapes are converted only inside string literals,
+    zero dates are replaced with NULL only where they are a whole
+    literal, and comments and DELIMITER lines are removed only
+    outside literals.  Text can be fed in pieces of any size; only
+    whole lines are converted, and anything after the last line
+    break is kept until the next call to `feed` or `close`.
+    """
+
+    def __init__(self):
+        self._state = NORMAL
+        self._pending = ''
+        self._literal = []
+
+    def feed(self, text):
+        end = text.rfind('\n') + 1
+
+        if end == 0:
+            self._pending += text
+            return ''
+
+        data = self._pending + text[:end]
+        self._pending = text[end:]
+
+        return self._transcode(data)
+
+    def close(self):
+        data = self._pending
+        self._pending = ''
+
+        result = self._transcode(data)
+
+        if self._state != NORMAL:
+            raise ValueError('INSERT statements end inside a {}'.format(self._state))
+
+        return result
+
+    def _transcode(self, data):
+        if self._state == NORMAL and data.startswith('INSERT INTO ') and not _UNUSUAL_LINE.search(data):
+            try:
+                return _ORDINARY.sub(_ordinary_token, data)
+            except _Unusual:
+                pass
+
+        return self._transcode_by_state(data)
+
+    def _transcode_by_state(self, data):
+        result = []
+        pos = 0
+        length = len(data)
+
+        while pos < length:
+            if self._state == NORMAL and (pos == 0 or data[pos - 1] == '\n'):
+                # Pass over the lines that need no conversion
+                m = _SPECIAL.search(data, pos)
+
+                if not m:
+                    result.append(_replace_zero_dates(data[pos:]))
+                    break
+
+                line_start = max(pos, data.rfind('\n', pos, m.start()) + 1)
+                result.append(_replace_zero_dates(data[pos:line_start]))
+                pos = line_start
+
+                if data.startswith(('--', 'DELIMITER'), pos):
+                    pos = data.find('\n', pos) + 1 or length
+                    result.append('\n')
+                    continue
+
+            line_end = data.find('\n', pos) + 1 or length
+
+            if self._state == NORMAL:
+                m = _NORMAL.search(data, pos, line_end)
+
+                if not m:
+                    result.append(data[pos:line_end])
+                    pos = line_end
+                    continue
+
+                result.append(data[pos:m.start()])
+                pos = m.end()
+                token = m.group()
+
+                if m.lastgroup == 'plain':
+                    # A literal with no escapes
+                    result.append('NULL' if token[1:-1] in ZERO_DATES else token)
+                elif token == "'":
+                    self._state = LITERAL
+                    self._literal = []
+                elif token == '"':
+                    self._state = IDENTIFIER
+                    result.append(token)
+                else:
+                    self._state = COMMENT
+
+            elif self._state == LITERAL:
+                m = _LITERAL.search(data, pos)
+
+                if not m:
+                    self._literal.append(data[pos:])
+                    break
+
+                self._literal.append(data[pos:m.start()])
+                pos = m.end()
+
+                if m.group() == '\\':
+                    escaped = data[pos:pos + 1]
+                    self._literal.append(ESCAPES.get(escaped, escaped))
+                    pos += 1
+                elif data.startswith("'", pos):
+                    self._literal.append("''")
+                    pos += 1
+                else:
+                    result.append(_literal(''.join(self._literal)))
+                    self._state = NORMAL
+
+            elif self._state == IDENTIFIER:
+                end = data.find('"', pos)
+
+                if end < 0:
+                    result.append(data[pos:])
+                    break
+
+                result.append(data[pos:end + 1])
+                pos = end + 1
+                self._state = NORMAL
+
+            else:
+                end = data.find('*/', pos)
+
+                if end < 0:
+                    break
+
+                pos = end + 2
+                self._state = NORMAL
+
+                if data.startswith(';', pos):
+                    pos += 1
+
+        return ''.join(result)
@@ -0,0 +1,32 @@
+"""Isolation of the rows that make a batch fail
+"""
+
+
+def isolate_failures(items, error, execute, is_row_error):
+    """Finds the items of a batch that failed with `error` that
+    fail on their own, by running `execute` on each half of the
+    batch, then on each half of any half that fails, and so on.
+    The halves that succeed are left executed.
+
+    Only errors for which `is_row_error` is true are isolated.
+    Any other error, such as a lost connection, would fail every
+    half, so is raised.
+
+    Returns a list of the failing items with their errors.
+    """
+    if len(items) == 1:
+        return [(items[0], error)]
+
+    result = []
+    middle = len(items) // 2
+
+    for half in (items[:middle], items[middle:]):
+        try:
+            execute(half)
+        except Exception as e:
+            if not is_row_error(e):
+                raise
+
+            result.extend(isolate_failures(half, e, execute, is_row_error))
+
+    return result
@@ -0,0 +1,85 @@
+"""Load throughput metrics
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+# The phases of a load, whose times are recorded for each table
+PHASES = ('dump', 'transform', 'execute', 'index', 'foreign_key')
+
+
+class TableMetrics():
+    def __init__(self):
+        self.rows = 0
+        self.bytes_read = 0
+        self.bytes_sent = 0
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+
+    def rows_per_second(self):
+        seconds = self.seconds['dump'] + self.seconds['transform'] + self.seconds['execute']
+        return self.rows / seconds if seconds else 0
+
+
+class LoadMetrics():
+    """The rows and bytes loaded into each table and the time
+    spent on each phase of loading it, collected from any thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tables = {}
+
+    def add(self, table, rows=0, bytes_read=0, bytes_sent=0, **seconds):
+        with self._lock:
+            t = self.tables.setdefault(table, TableMetrics())
+            t.rows += rows
+            t.bytes_read += bytes_read
+            t.bytes_sent += bytes_sent
+
+            for phase, s in seconds.items():
+                t.seconds[phase] += s
+
+    @contextmanager
+    def timed(self, table, phase):
+        start = time.monotonic()
+
+        try:
+            yield
+        finally:
+            self.add(table, **{phase: time.monotonic() - start})
+
+    def totals(self):
+        """The metrics of all the tables added together.  Tables
+        loaded at the same time each count their own time.
+        """
+        result = TableMetrics()
+
+        with self._lock:
+            for t in self.tables.values():
+                result.rows += t.rows
+                result.bytes_read += t.bytes_read
+                result.bytes_sent += t.bytes_sent
+
+                for phase, s in t.seconds.items():
+                    result.seconds[phase] += s
+
+        return result
+
+
+def timed(iterable, record):
+    """Yields the items of `iterable`, calling `record` with the
+    seconds taken to produce each one.
+    """
+    iterator = iter(iterable)
+
+    while True:
+        start = time.monotonic()
+
+        try:
+            item = next(iterator)
+        except StopIteration:
+            record(time.monotonic() - start)
+            return
+
+        record(time.monotonic() - start)
+        yield item
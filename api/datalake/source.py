@@ -0,0 +1,332 @@
+"""MySQL source database access
+"""
+import hashlib
+from collections import namedtuple
+import pymysql
+from pymysql.constants import FIELD_TYPE
+from pymysql.converters import conversions
+
+ZERO_DATE = '0000-00-00'
+
+AUTO_INCREMENT = 'auto_increment'
+LAST_MODIFIED = 'last_modified'
+
+INTEGER_TYPES = ('tinyint', 'smallint', 'mediumint', 'int', 'bigint')
+
+SQL_BASE_TABLES = '''
+SELECT TABLE_NAME
+FROM information_schema.TABLES
+WHERE TABLE_SCHEMA = %s
+    AND TABLE_TYPE = 'BASE TABLE'
+ORDER BY TABLE_NAME
+'''
+
+SQL_TABLE_SIZES = '''
+SELECT TABLE_NAME, COALESCE(DATA_LENGTH, 0)
+FROM information_schema.TABLES
+WHERE TABLE_SCHEMA = %s
+    AND TABLE_TYPE = 'BASE TABLE'
+'''
+
+SQL_COLUMNS = '''
+SELECT COLUMN_NAME
+FROM information_schema.COLUMNS
+WHERE TABLE_SCHEMA = %s
+    AND TABLE_NAME = %s
+ORDER BY ORDINAL_POSITION
+'''
+
+
+SQL_COLUMN_DETAILS = '''
+SELECT COLUMN_NAME, COLUMN_TYPE, DATA_TYPE, IS_NULLABLE, COLUMN_KEY, EXTRA
+FROM information_schema.COLUMNS
+WHERE TABLE_SCHEMA = %s
+    AND TABLE_NAME = %s
+ORDER BY ORDINAL_POSITION
+'''
+
+# Update times in the last couple of seconds are ignored, as rows
+# may still be committed in the same second
+SQL_TABLE_UPDATE_TIMES = '''
+SELECT TABLE_NAME, CASE WHEN UPDATE_TIME < NOW() - INTERVAL 2 SECOND THEN UPDATE_TIME END
+FROM information_schema.TABLES
+WHERE TABLE_SCHEMA = %s
+    AND TABLE_TYPE = 'BASE TABLE'
+'''
+
+# The definitions that make up a database's schema, in a stable
+# order, for its fingerprint
+SQL_SCHEMA_COLUMNS = '''
+SELECT TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION, COLUMN_TYPE, IS_NULLABLE, COLUMN_DEFAULT, EXTRA
+FROM information_schema.COLUMNS
+WHERE TABLE_SCHEMA = %s
+ORDER BY TABLE_NAME, ORDINAL_POSITION
+'''
+
+SQL_SCHEMA_INDEXES = '''
+SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, SEQ_IN_INDEX, COLUMN_NAME, SUB_PART, INDEX_TYPE
+FROM information_schema.STATISTICS
+WHERE TABLE_SCHEMA = %s
+ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+'''
+
+SQL_SCHEMA_CONSTRAINTS = '''
+SELECT TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+FROM information_schema.KEY_COLUMN_USAGE
+WHERE TABLE_SCHEMA = %s
+ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION
+'''
+
+
+ColumnDetails = namedtuple('ColumnDetails', ['name', 'column_type', 'data_type', 'is_nullable', 'key', 'extra'])
+Schema = namedtuple('Schema', ['columns', 'indexes', 'constraints'])
+SchemaColumn = namedtuple('SchemaColumn', ['table', 'name', 'position', 'column_type', 'is_nullable', 'default', 'extra'])
+SchemaIndex = namedtuple('SchemaIndex', ['table', 'name', 'non_unique', 'position', 'column', 'sub_part', 'index_type'])
+SchemaConstraint = namedtuple('SchemaConstraint', ['table', 'name', 'position', 'column', 'referenced_table', 'referenced_column'])
+IncrementalKey = namedtuple('IncrementalKey', ['column', 'kind', 'merge_columns'])
+
+
+def _zero_date_as_null(convert):
+    # MySQL uses '0000-00-00' for NULL dates and
+    # '0000-00-00 00:00:00' for NULL datetimes
+    def result(value):
+        if value.startswith(ZERO_DATE):
+            return None
+        return convert(value)
+
+    return result
+
+
+def _bit_to_int(value):
+    if isinstance(value, str):
+        value = value.encode('latin1')
+    return int.from_bytes(value, 'big')
+
+
+def source_conversions():
+    """PyMySQL value conversions that produce values
+    that pyodbc can bind to their MS SQL equivalents.
+    """
+    result = dict(conversions)
+
+    for field_type in [FIELD_TYPE.DATE, FIELD_TYPE.NEWDATE, FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP]:
+        result[field_type] = _zero_date_as_null(conversions[field_type])
+
+    # pyodbc cannot bind timedeltas, so leave times as strings
+    result.pop(FIELD_TYPE.TIME, None)
+    result[FIELD_TYPE.BIT] = _bit_to_int
+
+    return result
+
+
+def connect(host, user, password, database):
+    return pymysql.connect(
+        host=host,
+        user=user,
+        password=password,
+        database=database,
+        charset='utf8mb4',
+        conv=source_conversions(),
+    )
+
+
+def start_snapshot(conn):
+    """Equivalent of mysqldump's --single-transaction
+    """
+    with conn.cursor() as cursor:
+        cursor.execute('SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        cursor.execute('START TRANSACTION WITH CONSISTENT SNAPSHOT')
+
+
+def base_tables(conn, database):
+    with conn.cursor() as cursor:
+        cursor.execute(SQL_BASE_TABLES, (database,))
+        return [r[0] for r in cursor.fetchall()]
+
+
+def table_sizes(conn, database):
+    with conn.cursor() as cursor:
+        cursor.execute(SQL_TABLE_SIZES, (database,))
+        return {r[0]: r[1] for r in cursor.fetchall()}
+
+
+def table_columns(conn, database, table):
+    with conn.cursor() as cursor:
+        cursor.execute(SQL_COLUMNS, (database, table))
+        return [r[0] for r in cursor.fetchall()]
+
+
+def quote_mysql(identifier):
+    return '`{}`'.format(identifier.replace('`', '``'))
+
+
+def read_batches(conn, table, columns, batch_size, where=None, parameters=None, order_by=None):
+    """Reads a table through an unbuffered server-side cursor,
+    yielding lists of at most `batch_size` row tuples.
+    """
+    sql = 'SELECT {} FROM {}'.format(
+        ', '.join(quote_mysql(c) for c in columns),
+        quote_mysql(table),
+    )
+
+    if where:
+        sql += ' WHERE ' + where
+
+    if order_by:
+        sql += ' ORDER BY ' + quote_mysql(order_by)
+
+    with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(sql, parameters)
+
+        while True:
+            rows = cursor.fetchmany(batch_size)
+
+            if not rows:
+                return
+
+            yield rows
+
+
+def column_details(conn, database, table):
+    with conn.cursor() as cursor:
+        cursor.execute(SQL_COLUMN_DETAILS, (database, table))
+        return [ColumnDetails(*r) for r in cursor.fetchall()]
+
+
+def column_signature(columns):
+    """A hash of a table's column definitions, which
+    changes when the table's structure changes.
+    """
+    definitions = '\n'.join(
+        '{} {} {}'.format(c.name, c.column_type, c.is_nullable) for c in columns
+    )
+    return hashlib.sha256(definitions.encode('utf8')).hexdigest()
+
+
+def read_schema(conn, database):
+    """Reads a database's column, index and constraint
+    definitions from information_schema.
+    """
+    result = []
+
+    with conn.cursor() as cursor:
+        for sql, row in ((SQL_SCHEMA_COLUMNS, SchemaColumn), (SQL_SCHEMA_INDEXES, SchemaIndex), (SQL_SCHEMA_CONSTRAINTS, SchemaConstraint)):
+            cursor.execute(sql, (database,))
+            result.append([row(*r) for r in cursor.fetchall()])
+
+    return Schema(*result)
+
+
+def schema_fingerprint(schema, settings=()):
+    """A hash of a database's column, index and constraint
+    definitions, as read by `read_schema`, which changes when
+    its schema changes.  Any `settings` that affect how the
+    schema is translated are included in the hash.
+    """
+    h = hashlib.sha256()
+
+    for s in settings:
+        h.update('{}\n'.format(s).encode('utf8'))
+
+    for rows in schema:
+        h.update(b'\f')
+
+        for r in rows:
+            h.update('\t'.join('' if v is None else str(v) for v in r).encode('utf8'))
+            h.update(b'\n')
+
+    return h.hexdigest()
+
+
+def table_signatures(conn, database, tables):
+    """Gets a value for each table that changes whenever the
+    table's data changes, or None if there is no such value.
+
+    The table's last update time is used where MySQL has one, as
+    it costs nothing to read.  MySQL does not keep update times
+    for InnoDB tables over a restart, so otherwise the live
+    checksum kept by tables created with CHECKSUM=1 is used, and
+    only failing that is the table's checksum calculated, which
+    reads the whole table but does not transfer it.
+    """
+    with conn.cursor() as cursor:
+        try:
+            # MySQL 8 otherwise caches table statistics for a day
+            cursor.execute('SET SESSION information_schema_stats_expiry = 0')
+        except pymysql.MySQLError:
+            pass
+
+        cursor.execute(SQL_TABLE_UPDATE_TIMES, (database,))
+        update_times = dict(cursor.fetchall())
+
+        result = {}
+
+        for t in tables:
+            if update_times.get(t):
+                result[t] = 'update_time:{:%Y-%m-%d %H:%M:%S}'.format(update_times[t])
+                continue
+
+            # QUICK gives the live checksum, or NULL
+            # for tables that do not keep one
+            cursor.execute('CHECKSUM TABLE {} QUICK'.format(quote_mysql(t)))
+            checksum = cursor.fetchone()[1]
+
+            if checksum is None:
+                cursor.execute('CHECKSUM TABLE {}'.format(quote_mysql(t)))
+                checksum = cursor.fetchone()[1]
+
+            result[t] = 'checksum:{}'.format(checksum) if checksum is not None else None
+
+    return result
+
+
+def incremental_key(columns):
+    """Finds a column that can be used to select the rows that
+    have been added or changed since a previous load.
+
+    A last modified timestamp is preferred, as it picks up updates
+    as well as inserts, but rows can only be merged using it when
+    the table has a primary key.  Otherwise an auto increment
+    primary key picks up new rows, but not updated or deleted
+    ones, so such tables are loaded again in full when they change.
+    """
+    primary_key = [c.name for c in columns if c.key == 'PRI']
+
+    if not primary_key:
+        return None
+
+    for c in columns:
+        if c.data_type in ('timestamp', 'datetime') and 'on update' in c.extra.lower():
+            return IncrementalKey(c.name, LAST_MODIFIED, primary_key)
+
+    for c in columns:
+        if c.key == 'PRI' and AUTO_INCREMENT in c.extra.lower():
+            return IncrementalKey(c.name, AUTO_INCREMENT, [c.name])
+
+    return None
+
+
+def resume_key(columns):
+    """Finds an integer primary key column, which a partly
+    loaded table can be continued from when its rows are
+    loaded in key order.
+    """
+    primary_key = [c for c in columns if c.key == 'PRI']
+
+    if len(primary_key) == 1 and primary_key[0].data_type in INTEGER_TYPES:
+        return primary_key[0].name
+
+    return None
+
+
+def incremental_where(key):
+    # Rows changed in the same second as the last load's
+    # high water mark may not have been included in it
+    operator = '>=' if key.kind == LAST_MODIFIED else '>'
+    return '{} {} %s'.format(quote_mysql(key.column), operator)
+
+
+def max_value(conn, table, column):
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT MAX({}) FROM {}'.format(quote_mysql(column), quote_mysql(table)))
+        return cursor.fetchone()[0]
@@ -0,0 +1,122 @@
+"""Compressed spooling of dump output
+"""
+import gzip
+import io
+import os
+import tempfile
+
+GZIP = 'gzip'
+ZSTD = 'zstd'
+
+# Fast levels, as the spool is only read back once
+COMPRESSION_LEVELS = {
+    GZIP: 1,
+    ZSTD: 3,
+}
+
+SUFFIXES = {
+    None: '.sql',
+    GZIP: '.sql.gz',
+    ZSTD: '.sql.zst',
+}
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _zstd():
+    # zstd is in the standard library from Python 3.14,
+    # otherwise the zstandard package is needed
+    try:
+        from compression import zstd
+        return zstd
+    except ImportError:
+        pass
+
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        raise ValueError('zstd compression needs Python 3.14 or the zstandard package')
+
+
+def _open(path, mode, compression, level):
+    if compression is None:
+        return open(path, mode)
+    elif compression == GZIP:
+        return gzip.open(path, mode, compresslevel=level)
+    else:
+        zstd = _zstd()
+
+        # Both modules have a ZstdCompressor, but only the
+        # zstandard package's open takes one
+        if 'w' not in mode:
+            return zstd.open(path, mode)
+        elif zstd.__name__ == 'compression.zstd':
+            return zstd.open(path, mode, level=level)
+        else:
+            return zstd.open(path, mode, cctx=zstd.ZstdCompressor(level=level))
+
+
+class DumpSpool():
+    """A temporary file that the output of a dump command is
+    copied to, compressed as it is written, and read back a line
+    at a time, decompressed as it is read.
+
+    The size of the dump and of the file written for it are
+    counted, so that the space saved can be reported.
+    """
+
+    def __init__(self, directory=None, compression=GZIP, level=None):
+        if compression not in SUFFIXES:
+            raise ValueError('Unknown spool compression: {}'.format(compression))
+
+        if compression == ZSTD:
+            _zstd()
+
+        self.directory = directory
+        self.compression = compression
+        self.level = level or COMPRESSION_LEVELS.get(compression)
+        self.path = None
+
+        self.bytes_written = 0
+        self.bytes_on_disk = 0
+
+    def __enter__(self):
+        fd, self.path = tempfile.mkstemp(prefix='dump_', suffix=SUFFIXES[self.compression], dir=self.directory)
+        os.close(fd)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def fill(self, stream):
+        """Copies a binary stream, such as the stdout of a dump
+        process, into the spool.
+        """
+        with _open(self.path, 'wb', self.compression, self.level) as f:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+
+                if not chunk:
+                    break
+
+                f.write(chunk)
+                self.bytes_written += len(chunk)
+
+        self.bytes_on_disk = os.path.getsize(self.path)
+
+    def lines(self):
+        with io.TextIOWrapper(_open(self.path, 'rb', self.compression, self.level), encoding='utf8') as f:
+            yield from f
+
+    def summary(self):
+        return '{:,} bytes spooled as {:,} bytes ({}, {:.1f}x smaller)'.format(
+            self.bytes_written,
+            self.bytes_on_disk,
+            self.compression or 'uncompressed',
+            self.bytes_written / self.bytes_on_disk if self.bytes_on_disk else 0,
+        )
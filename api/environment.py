@@ -1,6 +1,7 @@
 """Environment Variables
 """
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,6 +20,29 @@ EMAIL_SMTP_SERVER = os.environ["EMAIL_SMTP_SERVER"]
 
 DEFAULT_RECIPIENT = os.environ["DEFAULT_RECIPIENT"]
 DATABASE_ECHO = os.environ["DATABASE_ECHO"] == 'True'
+DATABASE_POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", 5))
+DATABASE_MAX_OVERFLOW = int(os.environ.get("DATABASE_MAX_OVERFLOW", 10))
+DATABASE_POOL_TIMEOUT = int(os.environ.get("DATABASE_POOL_TIMEOUT", 30))
+DATABASE_POOL_RECYCLE = int(os.environ.get("DATABASE_POOL_RECYCLE", 3600))
+DATABASE_POOL_PRE_PING = os.environ.get("DATABASE_POOL_PRE_PING", 'True') == 'True'
+
+# Comma separated ETL class names, or the start of them, to profile
+ETL_PROFILE = [n.strip() for n in os.environ.get("ETL_PROFILE", '').split(',') if n.strip()]
+
+# Datalake steps run at once by the combined datalake ETLs
+ETL_DATALAKE_WORKERS = int(os.environ.get("ETL_DATALAKE_WORKERS", 4))
+
+# Steps that may use a host at once, for all hosts and as
+# comma separated host=slots for particular hosts, and the
+# temporary disk space that steps may use between them
+ETL_DEFAULT_HOST_SLOTS = int(os.environ.get("ETL_DEFAULT_HOST_SLOTS", 4))
+ETL_HOST_SLOTS = {
+    h.strip(): int(n) for h, n in (s.split('=') for s in os.environ.get("ETL_HOST_SLOTS", '').split(',') if s.strip())
+}
+ETL_TEMP_DISK_LIMIT_GB = float(os.environ.get("ETL_TEMP_DISK_LIMIT_GB", 50))
+
+ETL_MESSAGE_SPOOL_PATH = os.environ.get("ETL_MESSAGE_SPOOL_PATH", os.path.join(tempfile.gettempdir(), 'etl_task_message_spool.jsonl'))
+ETL_MESSAGE_REJECTED_PATH = os.environ.get("ETL_MESSAGE_REJECTED_PATH", os.path.join(tempfile.gettempdir(), 'etl_task_message_rejected.jsonl'))
 
 ETL_CENTRAL_CONNECTION_STRING = os.environ["ETL_CENTRAL_CONNECTION_STRING"]
 ETL_DATABASES_PREFIX = os.environ["ETL_DATABASES_PREFIX"]
@@ -0,0 +1,80 @@
+"""Process-wide limits on the ETL steps using each host
+and the temporary disk at once
+"""
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from api.environment import ETL_HOST_SLOTS, ETL_DEFAULT_HOST_SLOTS, ETL_TEMP_DISK_LIMIT_GB
+
+GB = 1024 * 1024 * 1024
+
+# The hosts that a step connects to, and the bytes of
+# temporary disk space that it may use
+Resources = namedtuple('Resources', ['hosts', 'temp_disk'], defaults=[(), 0])
+
+Lease = namedtuple('Lease', ['hosts', 'temp_disk', 'waited'])
+
+
+class ResourceGovernor():
+    """Hands out slots on each host, `host_slots` for the hosts
+    given and `default_host_slots` for any other, and shares out
+    `temp_disk_limit` bytes of temporary disk space, between the
+    steps running in the process.
+
+    A step waits until all of the resources it needs are free and
+    then takes them together, so that steps waiting for each
+    other's hosts cannot deadlock.  A step that needs more disk
+    space than the limit waits until it can have all of it.
+    """
+
+    def __init__(self, host_slots=None, default_host_slots=None, temp_disk_limit=None):
+        self.host_slots = dict(host_slots or {})
+        self.default_host_slots = default_host_slots or ETL_DEFAULT_HOST_SLOTS
+        self.temp_disk_limit = temp_disk_limit or ETL_TEMP_DISK_LIMIT_GB * GB
+
+        self._condition = threading.Condition()
+        self._hosts_in_use = Counter()
+        self._temp_disk_in_use = 0
+
+    def slots(self, host):
+        return self.host_slots.get(host, self.default_host_slots)
+
+    @contextmanager
+    def acquire(self, resources):
+        # A step using the same host as its source and
+        # destination only takes one of its slots
+        hosts = sorted({h for h in resources.hosts if h})
+        temp_disk = min(resources.temp_disk, self.temp_disk_limit)
+
+        start = time.monotonic()
+
+        with self._condition:
+            self._condition.wait_for(lambda: self._available(hosts, temp_disk))
+
+            self._hosts_in_use.update(hosts)
+            self._temp_disk_in_use += temp_disk
+
+        try:
+            yield Lease(hosts, temp_disk, time.monotonic() - start)
+        finally:
+            with self._condition:
+                self._hosts_in_use.subtract(hosts)
+                self._temp_disk_in_use -= temp_disk
+                self._condition.notify_all()
+
+    def _available(self, hosts, temp_disk):
+        if any(self._hosts_in_use[h] >= self.slots(h) for h in hosts):
+            return False
+
+        return self._temp_disk_in_use + temp_disk <= self.temp_disk_limit
+
+    def usage(self):
+        with self._condition:
+            return dict(
+                hosts={h: n for h, n in self._hosts_in_use.items() if n},
+                temp_disk=self._temp_disk_in_use,
+            )
+
+
+governor = ResourceGovernor(host_slots=ETL_HOST_SLOTS)
@@ -0,0 +1,213 @@
+"""Background writer for ETL task messages
+"""
+import atexit
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from sqlalchemy import exc
+from api.database import etl_central_session
+from api.model import EtlTaskMessage
+from api import attachments
+from api.environment import ETL_MESSAGE_SPOOL_PATH, ETL_MESSAGE_REJECTED_PATH
+
+FLUSH_SIZE = 200
+FLUSH_SECONDS = 5.0
+
+# Messages are written straight to the spool file once this many
+# are waiting, so that a slow central database cannot hold them
+# all in memory
+MAX_PENDING = 10000
+
+_STOP = object()
+
+
+def _is_connection_error(error):
+    """Whether writing failed because the central database could
+    not be reached, rather than because of the messages written
+    """
+    return isinstance(error, (exc.OperationalError, exc.InterfaceError)) or getattr(error, 'connection_invalidated', False)
+
+
+class TaskMessageSink():
+    """Collects task messages from any thread and writes them to
+    the central database in bulk from a background thread, when
+    `flush_size` messages are waiting or `flush_seconds` after
+    the first one arrived.
+
+    Attachments are stored separately, compressed and once for
+    each distinct content.  Messages that cannot be written because
+    the database cannot be reached are appended to a spool file,
+    and written with the next batch.  When a batch fails for any
+    other reason its messages are written one at a time, and those
+    that still fail are moved to a file of rejected messages, so
+    that one bad message cannot hold up the rest for ever.
+    """
+
+    def __init__(self, spool_path=None, flush_size=None, flush_seconds=None, max_pending=None, rejected_path=None):
+        self.spool_path = spool_path or ETL_MESSAGE_SPOOL_PATH
+        self.rejected_path = rejected_path or ETL_MESSAGE_REJECTED_PATH
+        self.flush_size = flush_size or FLUSH_SIZE
+        self.flush_seconds = flush_seconds or FLUSH_SECONDS
+        self.max_pending = max_pending or MAX_PENDING
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+
+    def put(self, etl_task_id, message_datetime, message_type, message, attachment=None):
+        row = dict(
+            etl_task_id=etl_task_id,
+            message_datetime=message_datetime,
+            message_type=message_type,
+            message=message,
+            attachment=attachment,
+        )
+
+        if self._queue.qsize() >= self.max_pending:
+            self._spool([row])
+            return
+
+        self._start()
+        self._queue.put(row)
+
+    def flush(self, timeout=None):
+        """Waits until the messages put so far have been written"""
+        if not self._running():
+            self._write(self._drain())
+            return
+
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Writes any waiting messages and stops the writer thread"""
+        if self._running():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        else:
+            self._write(self._drain())
+
+    def _running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _start(self):
+        with self._thread_lock:
+            if not self._running():
+                self._thread = threading.Thread(target=self._run, name='TaskMessageSink', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        batch = []
+        deadline = None
+
+        while True:
+            try:
+                item = self._queue.get(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, dict):
+                batch.append(item)
+
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_seconds
+
+                if len(batch) < self.flush_size:
+                    continue
+
+            self._write(batch)
+            batch = []
+            deadline = None
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                return
+
+    def _drain(self):
+        result = []
+
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return result
+
+            if isinstance(item, dict):
+                result.append(item)
+
+    def _write(self, batch):
+        rows = self._unspool() + batch
+
+        if not rows:
+            return
+
+        try:
+            self._insert(rows)
+            return
+        except Exception as e:
+            if _is_connection_error(e):
+                logging.warning('Could not write {:,} task messages, spooling to {}: {}'.format(len(rows), self.spool_path, e))
+                self._spool(rows)
+                return
+
+            logging.warning('Could not write {:,} task messages, writing them one at a time: {}'.format(len(rows), e))
+
+        for i, r in enumerate(rows):
+            try:
+                self._insert([r])
+            except Exception as e:
+                if _is_connection_error(e):
+                    logging.warning('Could not write {:,} task messages, spooling to {}: {}'.format(len(rows) - i, self.spool_path, e))
+                    self._spool(rows[i:])
+                    return
+
+                logging.error('Could not write task message, moving it to {}: {}'.format(self.rejected_path, e))
+                self._reject(r, e)
+
+    def _insert(self, rows):
+        with etl_central_session() as session:
+            # The rows keep their attachments, in case they
+            # have to be spooled
+            messages = [dict(r) for r in rows]
+            attachments.store(session, messages)
+            session.bulk_insert_mappings(EtlTaskMessage, messages)
+
+    def _spool(self, rows):
+        with self._spool_lock, open(self.spool_path, 'a', encoding='utf8') as f:
+            for r in rows:
+                f.write(self._serialise(r))
+                f.write('\n')
+
+    def _reject(self, row, error):
+        with self._spool_lock, open(self.rejected_path, 'a', encoding='utf8') as f:
+            f.write(self._serialise(dict(row, error=str(error))))
+            f.write('\n')
+
+    def _serialise(self, row):
+        return json.dumps(dict(row, message_datetime=row['message_datetime'].isoformat()), default=str)
+
+    def _unspool(self):
+        with self._spool_lock:
+            if not os.path.exists(self.spool_path):
+                return []
+
+            with open(self.spool_path, encoding='utf8') as f:
+                rows = [json.loads(l) for l in f if l.strip()]
+
+            os.remove(self.spool_path)
+
+        for r in rows:
+            r['message_datetime'] = datetime.datetime.fromisoformat(r['message_datetime'])
+
+        return rows
+
+
+message_sink = TaskMessageSink()
+atexit.register(message_sink.close)
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Date, DateTime, Boolean, LargeBinary, ForeignKey
 from sqlalchemy.orm import relationship
 from api.database import Base
 
@@ -48,8 +48,8 @@ class EtlTask(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String)
-    start_datetime = Column(Date)
-    end_datetime = Column(Date)
+    start_datetime = Column(DateTime)
+    end_datetime = Column(DateTime)
 
 
 class EtlTaskMessage(Base):
@@ -62,3 +62,88 @@ class EtlTaskMessage(Base):
     message_type = Column(String)
     message = Column(String)
     attachment = Column(String)
+    attachment_hash = Column(String)
+
+
+class EtlAttachment(Base):
+    __tablename__ = 'etl_attachment'
+
+    id = Column(Integer, primary_key=True)
+    hash = Column(String)
+    size = Column(Integer)
+    truncated = Column(Boolean)
+    content = Column(LargeBinary)
+    created_datetime = Column(DateTime)
+
+
+class EtlDatalakeTable(Base):
+    __tablename__ = 'etl_datalake_table'
+
+    id = Column(Integer, primary_key=True)
+    database_name = Column(String)
+    table_name = Column(String)
+    key_column = Column(String)
+    key_type = Column(String)
+    high_water_mark = Column(String)
+    column_signature = Column(String)
+    last_load_datetime = Column(DateTime)
+    last_full_load_datetime = Column(DateTime)
+    signature = Column(String)
+
+
+class EtlDatalakeCheckpoint(Base):
+    __tablename__ = 'etl_datalake_checkpoint'
+
+    id = Column(Integer, primary_key=True)
+    database_name = Column(String)
+    table_name = Column(String)
+    load_start_datetime = Column(DateTime)
+    records = Column(Integer)
+    batches = Column(Integer)
+    completed = Column(Boolean)
+    updated_datetime = Column(DateTime)
+
+
+class EtlDatalakeMetric(Base):
+    __tablename__ = 'etl_datalake_metric'
+
+    id = Column(Integer, primary_key=True)
+    etl_task_id = Column(Integer)
+    database_name = Column(String)
+    table_name = Column(String)
+    load_type = Column(String)
+    completed = Column(Boolean)
+    rows = Column(BigInteger)
+    bytes_read = Column(BigInteger)
+    bytes_sent = Column(BigInteger)
+    dump_seconds = Column(Float)
+    transform_seconds = Column(Float)
+    execute_seconds = Column(Float)
+    index_seconds = Column(Float)
+    foreign_key_seconds = Column(Float)
+    total_seconds = Column(Float)
+    created_datetime = Column(DateTime)
+
+
+class EtlDatalakeQuarantine(Base):
+    __tablename__ = 'etl_datalake_quarantine'
+
+    id = Column(Integer, primary_key=True)
+    database_name = Column(String)
+    table_name = Column(String)
+    load_start_datetime = Column(DateTime)
+    error = Column(String)
+    content = Column(String)
+    created_datetime = Column(DateTime)
+
+
+class EtlDatalakeSchema(Base):
+    __tablename__ = 'etl_datalake_schema'
+
+    id = Column(Integer, primary_key=True)
+    database_name = Column(String)
+    fingerprint = Column(String)
+    creates = Column(String)
+    indexes = Column(String)
+    foreign_keys = Column(String)
+    updated_datetime = Column(DateTime)
@@ -0,0 +1,126 @@
+"""Opt-in profiling of ETL steps
+"""
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+from api.environment import ETL_PROFILE
+
+# Number of functions and allocation sites reported
+TOP = 30
+
+# Frames kept for each traced allocation
+TRACEMALLOC_FRAMES = 5
+
+_profiled = {n.strip().lower() for n in ETL_PROFILE}
+
+# Only one cProfile profiler can be active at a time, so steps
+# run by a profiled step are not profiled themselves
+_profile_lock = threading.Lock()
+
+# tracemalloc traces the whole process, so it is started by the
+# first profile to be entered and stopped when the last one exits,
+# unless it was already tracing
+_tracing_lock = threading.Lock()
+_tracing_profiles = 0
+_started_tracing = False
+
+
+def enable(names):
+    """Profiles the ETLs whose class names start with any of
+    `names`, ignoring case.  An empty name profiles every ETL.
+    """
+    _profiled.update(n.lower() for n in names)
+
+
+def enabled(etl):
+    if not _profiled:
+        return False
+
+    name = type(etl).__name__.lower()
+
+    return any(name.startswith(p) for p in _profiled)
+
+
+class Profile():
+    """Profiles the functions called by the current thread with
+    cProfile, and the memory allocated by every thread with
+    tracemalloc, while the context is entered.
+    """
+
+    def __init__(self, top=None):
+        self.top = top or TOP
+        self.seconds = 0
+        self.peak_bytes = 0
+        self._profile = None
+        self._snapshot = None
+
+    def __enter__(self):
+        global _tracing_profiles, _started_tracing
+
+        with _tracing_lock:
+            if _tracing_profiles == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                _started_tracing = True
+
+            _tracing_profiles += 1
+
+        if _profile_lock.acquire(blocking=False):
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+        self._start = time.monotonic()
+
+        return self
+
+    def __exit__(self, *exc):
+        global _tracing_profiles, _started_tracing
+
+        self.seconds = time.monotonic() - self._start
+
+        if self._profile:
+            self._profile.disable()
+            _profile_lock.release()
+
+        with _tracing_lock:
+            if tracemalloc.is_tracing():
+                self._snapshot = tracemalloc.take_snapshot()
+                self.peak_bytes = tracemalloc.get_traced_memory()[1]
+
+            _tracing_profiles -= 1
+
+            if _tracing_profiles == 0 and _started_tracing:
+                tracemalloc.stop()
+                _started_tracing = False
+
+        return False
+
+    def report(self):
+        result = io.StringIO()
+
+        result.write('Ran for {:.1f} seconds with a peak of {:,.1f} MB traced memory\n\n'.format(
+            self.seconds,
+            self.peak_bytes / 1e6,
+        ))
+
+        if self._profile:
+            result.write('Top {} functions by cumulative time\n'.format(self.top))
+            pstats.Stats(self._profile, stream=result).sort_stats('cumulative').print_stats(self.top)
+        else:
+            result.write('Functions not profiled, as another profile was running\n\n')
+
+        if self._snapshot is None:
+            result.write('Allocations not traced\n')
+            return result.getvalue()
+
+        result.write('Top {} allocations still held at the end\n'.format(self.top))
+
+        for s in self._snapshot.statistics('traceback')[:self.top]:
+            result.write('{:,.1f} KB in {:,} blocks\n'.format(s.size / 1024, s.count))
+
+            for line in s.traceback.format(limit=TRACEMALLOC_FRAMES):
+                result.write('{}\n'.format(line))
+
+        return result.getvalue()
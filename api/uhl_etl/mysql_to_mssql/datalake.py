@@ -3,12 +3,17 @@
 from api.emailing import email_error
 import re
 import subprocess
-import pyodbc
 import os
 import logging
+import queue
+import threading
+import traceback
 import time
+import datetime
 from collections import namedtuple
-from tempfile import NamedTemporaryFile
+from contextlib import closing
+from enum import Enum
+from tempfile import NamedTemporaryFile, TemporaryDirectory, TemporaryFile
 from api.core import Etl, EtlStep, Schedule
 from api.environment import (
     ETL_DATABASES_HOST,
@@ -18,36 +23,61 @@ from api.environment import (
     MS_SQL_DWH_USER,
     MS_SQL_DWH_PASSWORD,
     REDCAP_DATABASES_HOST,
+    ETL_DATALAKE_WORKERS,
 )
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import itertools
 from api.database import connection, etl_central_session, brc_dwh_cursor
+from api.model import EtlDatalakeTable, EtlDatalakeCheckpoint, EtlDatalakeSchema, EtlDatalakeQuarantine, EtlDatalakeMetric
+from api.datalake.dump import DumpStream, DumpError
+from api.datalake.spool import DumpSpool, GZIP
+from api.governor import Resources, GB
+from api.datalake import source, bulk, batching, isolation, metrics
+from api.datalake.ddl import Ddl, DdlGenerator, TRANSLATOR_VERSION, statements_by_table
+from api.datalake.inserts import InsertTranscoder
+from api.datalake.destination import MssqlDestination
 
-SQL_DROP_DB = '''
-IF EXISTS (SELECT name FROM sys.databases WHERE name = N'{0}')
-    DROP DATABASE [{0}];
-'''
-SQL_CREATE_DB = '''
-CREATE DATABASE [{0}];
-'''
-SQL_SIMPLE_RECOVERY = '''
-ALTER DATABASE [{0}] SET RECOVERY SIMPLE;
-'''
+# Batches start at BATCH_SIZE rows and are then sized to take
+# about BATCH_TARGET_SECONDS to execute, within the row and
+# byte limits
+BATCH_SIZE = 500
+BATCH_MAX_ROWS = 10000
+BATCH_MAX_BYTES = 4 * 1024 * 1024
+BATCH_TARGET_SECONDS = 2.0
 
+# Indexes and foreign keys are created by this many
+# connections at once, each working on one table at a time.
+CONSTRAINT_WORKERS = 4
 
-Ddl = namedtuple('DDL', ['creates', 'indexes', 'foreign_keys'])
+# Temporary disk space assumed to be used by a step that
+# spools its dump or writes bulk files, unless it is given
+TEMP_DISK_BUDGET = 5 * GB
 
+# A failed full load is only resumed within this many hours
+# of it starting, so that the tables loaded before and after
+# the failure are not too far apart
+RESUME_HOURS = 36
+
+# A partly loaded table's checkpoint is saved after its first
+# batch, and then every CHECKPOINT_BATCHES batches or
+# CHECKPOINT_SECONDS seconds, rather than after every batch
+CHECKPOINT_BATCHES = 50
+CHECKPOINT_SECONDS = 60
+
+INSERT_TABLE = re.compile(r'INSERT INTO "((?:[^"]|"")*)"')
+
+
+SourceTableState = namedtuple('SourceTableState', ['name', 'key', 'column_signature', 'high_water_mark', 'signature'])
+
+
+class TransferEngine(Enum):
+    # mysqldump INSERT statements run as T-SQL text
+    INSERTS = 'inserts'
+    # PyMySQL rows written with pyodbc parameterised executemany
+    EXECUTEMANY = 'executemany'
+    # PyMySQL rows written to bulk load files and loaded with bcp
+    BULK_FILES = 'bulk_files'
 
-def grouper_it(n, iterable):
-    it = iter(iterable)
-    while True:
-        chunk_it = itertools.islice(it, n)
-        try:
-            first_el = next(chunk_it)
-        except StopIteration:
-            return
-        yield itertools.chain((first_el,), chunk_it)
-        
 
 class MysqlToMssqlStep(EtlStep):
 
@@ -63,6 +93,25 @@ class MysqlToMssqlStep(EtlStep):
         keys_to_ignore=None,
         tables_to_ignore=None,
         constraints_to_ignore=None,
+        stream_dump=True,
+        transfer_engine=None,
+        bulk_directory=None,
+        bulk_loader=None,
+        incremental=False,
+        full_reload_days=7,
+        skip_unchanged=False,
+        table_workers=1,
+        batch_max_rows=None,
+        batch_max_bytes=None,
+        batch_target_seconds=None,
+        resume=False,
+        reuse_schema=True,
+        constraint_workers=None,
+        error_budget=0,
+        destination=None,
+        spool_directory=None,
+        spool_compression=GZIP,
+        temp_disk_budget=None,
     ):
         super().__init__()
         self.source_database_host = source_database_host
@@ -75,35 +124,596 @@ class MysqlToMssqlStep(EtlStep):
         self.source_database_name = database_name
         self.destination_database_name = 'datalake_{}'.format(database_name)
 
+        # Full loads are made into a staging database, which replaces
+        # the destination database once it is complete, so that the
+        # destination is only unavailable for a few seconds.
+        self.loading_database_name = '{}__loading'.format(self.destination_database_name)
+        self.target_database_name = self.destination_database_name
+
+        # The database server loaded into, SQL Server unless another
+        # Destination, such as a SqliteDestination, is given
+        self.destination = destination or MssqlDestination(brc_dwh_cursor)
+
         self.keys_to_ignore = keys_to_ignore or []
         self.tables_to_ignore = tables_to_ignore or []
         self.constraints_to_ignore = constraints_to_ignore or []
 
+        # Stream the data dump straight into the destination rather
+        # than spooling it to a temporary file first.  The spool file
+        # is written beneath spool_directory, compressed with
+        # spool_compression, which may be gzip, zstd or None.
+        self.stream_dump = stream_dump
+        self.spool_directory = spool_directory
+        self.spool_compression = spool_compression
+
+        # The temporary disk space that the step is allowed, shared
+        # with the other steps by the resource governor
+        self.temp_disk_budget = temp_disk_budget
+        self.transfer_engine = transfer_engine or TransferEngine.INSERTS
+
+        # Bulk files are written to a temporary directory beneath
+        # bulk_directory and loaded by bulk_loader, which is called
+        # with the database name, table name, data file and format file.
+        self.bulk_directory = bulk_directory
+        self.bulk_loader = bulk_loader or bulk.bcp_command(
+            host=destination_database_host,
+            user=destination_database_user,
+            password=destination_database_password,
+        )
+
+        # Load only the rows added or changed since the last load,
+        # with a full reload every full_reload_days days or when a
+        # table changes.
+        self.incremental = incremental
+        self.full_reload_days = full_reload_days
+
+        # Leave tables whose data has not changed since the last
+        # incremental load as they are.  Telling whether a table has
+        # changed may mean checksumming it in the source database.
+        self.skip_unchanged = skip_unchanged
+
+        # Number of tables transferred at the same time, each with
+        # its own source and destination connections.  When greater
+        # than 1 each table is read in its own snapshot.
+        self.table_workers = table_workers
+        self.constraint_workers = constraint_workers or CONSTRAINT_WORKERS
+
+        self.batch_max_rows = batch_max_rows or BATCH_MAX_ROWS
+        self.batch_max_bytes = batch_max_bytes or BATCH_MAX_BYTES
+        self.batch_target_seconds = batch_target_seconds or BATCH_TARGET_SECONDS
+
+        # Record the progress of full loads, and continue a failed
+        # full load from where it stopped instead of starting again.
+        # Tables with an integer primary key are read in key order,
+        # so that a partly loaded table can be continued after the
+        # largest key loaded.  Other partly loaded tables are
+        # emptied and loaded again.
+        self.resume = resume
+        self.checkpointing = False
+        self.load_start_datetime = None
+        self.completed_tables = set()
+        self.resume_points = {}
+        self.resumed_records = {}
+        self.checkpoint_times = {}
+
+        # Reuse the translated DDL while the source schema's
+        # fingerprint is unchanged, and keep the database replaced
+        # by each full load, emptied, to load into next time
+        # instead of creating a new one.
+        self.reuse_schema = reuse_schema
+        self.schema_changed = True
+
+        # The columns of each source table, as read with the
+        # schema by a full load
+        self.source_columns = {}
+
+        # When a batch fails, find the rows that fail by loading
+        # each half of the batch, and so on, and quarantine them
+        # instead of abandoning the load, unless more than
+        # error_budget rows fail.  With an error budget of 0 the
+        # load stops at the first failed batch.
+        self.error_budget = error_budget
+        self.quarantined = 0
+        self.quarantine_lock = threading.Lock()
+
+        # Rows, bytes and the time spent on each phase of
+        # loading each table, saved at the end of each load
+        self.metrics = metrics.LoadMetrics()
+        self.load_type = None
+
+    def resources(self):
+        return Resources(
+            hosts=(self.source_database_host, self.destination_database_host),
+            temp_disk=self.temp_disk(),
+        )
+
+    def temp_disk(self):
+        if self.temp_disk_budget is not None:
+            return self.temp_disk_budget
+
+        if self.transfer_engine == TransferEngine.BULK_FILES:
+            return TEMP_DISK_BUDGET
+
+        if self.transfer_engine == TransferEngine.INSERTS and not self.stream_dump:
+            return TEMP_DISK_BUDGET
+
+        return 0
+
     def do_etl(self):
+        self.metrics = metrics.LoadMetrics()
+        self.load_type = None
+        start = time.monotonic()
+
+        try:
+            self.load()
+        except Exception:
+            # A failure to save the metrics must not
+            # hide the error that stopped the load
+            try:
+                self.save_metrics(time.monotonic() - start, completed=False)
+            except Exception:
+                self.log(
+                    message="Could not save the metrics for '{}'".format(self.destination_database_name),
+                    attachment=traceback.format_exc(),
+                    log_level='WARNING',
+                )
+                logging.warning(traceback.format_exc())
+
+            raise
+
+        self.save_metrics(time.monotonic() - start, completed=True)
+
+    def load(self):
+        source_tables = None
+        self.quarantined = 0
+        self.source_columns = {}
+
+        if self.incremental:
+            source_tables = self.source_table_states()
+
+            if self.can_load_incrementally(source_tables):
+                self.target_database_name = self.destination_database_name
+                self.load_type = 'incremental'
+                self.transfer_data_incrementally(source_tables)
+                self.save_table_states(source_tables, full_load=False)
+                return
+
         creates_file = NamedTemporaryFile(mode='w+t')
         indexes_file = NamedTemporaryFile(mode='w+t')
         foreign_keys_file = NamedTemporaryFile(mode='w+t')
 
+        self.target_database_name = self.loading_database_name
+        self.checkpointing = self.resume
+        self.completed_tables = set()
+        self.resume_points = {}
+        self.resumed_records = {}
+        self.checkpoint_times = {}
+
         try:
-            self.dump_ddl(creates_file, indexes_file, foreign_keys_file)
-            self.re_create_database(creates_file)
-            self.transfer_data_using_inserts()
-            self.create_constraints(indexes_file, foreign_keys_file)
+            fingerprint = self.get_ddl(creates_file, indexes_file, foreign_keys_file)
+            resuming = self.resume and not self.schema_changed and self.can_resume()
+            self.load_type = 'resumed' if resuming else 'full'
+
+            if resuming:
+                self.prepare_resume()
+            elif self.reuse_schema and not self.schema_changed and self.database_exists(self.loading_database_name):
+                self.empty_database(self.loading_database_name)
+                self.clear_checkpoints()
+            else:
+                self.re_create_database(creates_file)
+                self.save_schema(fingerprint, creates_file, indexes_file, foreign_keys_file)
+                self.clear_checkpoints()
+
+            self.transfer_data()
+
+            if resuming:
+                with self.destination.cursor(self.target_database_name) as conn:
+                    self.destination.drop_indexes(conn)
+
+            self.create_constraints(indexes_file, foreign_keys_file, self.source_table_sizes())
+            self.swap_in_loaded_database()
+
+            if self.checkpointing:
+                self.clear_checkpoints()
 
         finally:
             creates_file.close()
             indexes_file.close()
             foreign_keys_file.close()
 
+        if source_tables is not None:
+            self.save_table_states(source_tables, full_load=True)
+
+    def source_table_states(self):
+        """Gets the incremental key, column signature, high water
+        mark and data signature of each source table.  These are read
+        before the rows are transferred, so the next incremental load
+        may transfer some rows again, which the merge allows for.
+
+        Data signatures are only read when unchanged tables are
+        skipped, and an unchanged table keeps its saved high water
+        mark rather than having its key's largest value read again.
+        """
+        result = {}
+        saved = self.saved_table_states() if self.skip_unchanged else {}
+
+        with closing(self.source_connection()) as source_conn:
+            tables = self.source_tables(source_conn)
+            signatures = source.table_signatures(source_conn, self.source_database_name, tables) if self.skip_unchanged else {}
+
+            source.start_snapshot(source_conn)
+
+            for t in tables:
+                columns = source.column_details(source_conn, self.source_database_name, t)
+                key = source.incremental_key(columns)
+                signature = signatures.get(t)
+                high_water_mark = None
+
+                if key and signature is not None and t in saved and saved[t].signature == signature and saved[t].key_column == key.column:
+                    high_water_mark = saved[t].high_water_mark
+                elif key:
+                    high_water_mark = source.max_value(source_conn, t, key.column)
+
+                result[t] = SourceTableState(
+                    name=t,
+                    key=key,
+                    column_signature=source.column_signature(columns),
+                    high_water_mark=high_water_mark,
+                    signature=signature,
+                )
+
+        return result
+
+    def saved_table_states(self):
+        with etl_central_session() as session:
+            result = {
+                t.table_name: t for t in session.query(EtlDatalakeTable).filter(
+                    EtlDatalakeTable.database_name == self.source_database_name
+                ).all()
+            }
+
+            # Keep the values loaded once the session is committed
+            session.expunge_all()
+
+            return result
+
+    def save_table_states(self, source_tables, full_load):
+        now = datetime.datetime.now()
+
+        with etl_central_session() as session:
+            saved = {
+                t.table_name: t for t in session.query(EtlDatalakeTable).filter(
+                    EtlDatalakeTable.database_name == self.source_database_name
+                ).all()
+            }
+
+            for name, t in saved.items():
+                if name not in source_tables:
+                    session.delete(t)
+
+            for s in source_tables.values():
+                t = saved.get(s.name) or EtlDatalakeTable(
+                    database_name=self.source_database_name,
+                    table_name=s.name,
+                )
+
+                t.key_column = s.key.column if s.key else None
+                t.key_type = s.key.kind if s.key else None
+                t.high_water_mark = str(s.high_water_mark) if s.high_water_mark is not None else None
+                t.column_signature = s.column_signature
+                t.signature = s.signature
+                t.last_load_datetime = now
+
+                if full_load:
+                    t.last_full_load_datetime = now
+
+                session.add(t)
+
+    def can_load_incrementally(self, source_tables):
+        saved = self.saved_table_states()
+
+        if set(saved) != set(source_tables):
+            self.log('Tables have been added or removed, so running full load')
+            return False
+
+        for s in source_tables.values():
+            t = saved[s.name]
+
+            if t.column_signature != s.column_signature:
+                self.log("Table '{}' has changed, so running full load".format(s.name))
+                return False
+
+            if not t.last_full_load_datetime or t.last_full_load_datetime < datetime.datetime.now() - datetime.timedelta(days=self.full_reload_days):
+                self.log('Full load is due')
+                return False
+
+        if not self.database_exists(self.destination_database_name):
+            return False
+
+        return True
+
+    def transfer_data_incrementally(self, source_tables):
+        self.log("Incrementally transferring Data for '{}'".format(self.source_database_name))
+
+        start = time.monotonic()
+        total_records = 0
+        unchanged_tables = 0
+        saved = self.saved_table_states()
+
+        with closing(self.source_connection()) as source_conn, self.destination.cursor(self.target_database_name) as conn:
+            source.start_snapshot(source_conn)
+
+            # Rows are merged table by table, so a row may arrive
+            # before the row that it references
+            self.destination.disable_constraints(conn)
+
+            try:
+                for s in source_tables.values():
+                    high_water_mark = saved[s.name].high_water_mark
+
+                    if s.signature is not None and s.signature == saved[s.name].signature:
+                        # Leave the destination table as it is
+                        unchanged_tables += 1
+                    elif s.key is None or s.key.kind == source.AUTO_INCREMENT or high_water_mark is None:
+                        # An auto increment key only picks up new rows,
+                        # so a table that may have had rows updated or
+                        # deleted is loaded again in full
+                        self.destination.delete_rows(conn, s.name)
+                        total_records += self.load_table_using_executemany(source_conn, conn, s.name)
+                    else:
+                        total_records += self.merge_table_incrementally(source_conn, conn, s, high_water_mark)
+            finally:
+                self.destination.enable_constraints(conn)
+
+        self.log("{:,} of {:,} tables unchanged".format(unchanged_tables, len(source_tables)))
+        self.log_throughput(total_records, time.monotonic() - start)
+        self.log("Incrementally transferring Data for '{}' COMPLETED".format(self.source_database_name))
+
+    def merge_table_incrementally(self, source_conn, conn, source_table, high_water_mark):
+        columns = self.table_columns(source_conn, source_table.name)
+        key = source_table.key
+
+        staging_table = self.destination.create_staging_table(conn, source_table.name)
+
+        try:
+            records = self.load_table_using_executemany(
+                source_conn,
+                conn,
+                source_table.name,
+                destination_table=staging_table,
+                where=source.incremental_where(key),
+                parameters=(high_water_mark,),
+            )
+
+            self.destination.merge_staging_table(conn, staging_table, source_table.name, columns, key.merge_columns)
+        finally:
+            self.destination.drop_staging_table(conn, staging_table)
+
+        return records
+
+    def get_ddl(self, creates_file, indexes_file, foreign_keys_file):
+        """Writes the translated DDL for the source database, from
+        the DDL saved by the last full load when the schema's
+        fingerprint has not changed, and returns the fingerprint.
+        """
+        with closing(self.source_connection()) as source_conn:
+            tables = self.source_tables(source_conn)
+            schema = source.read_schema(source_conn, self.source_database_name)
+
+        fingerprint = source.schema_fingerprint(
+            schema,
+            settings=[
+                TRANSLATOR_VERSION,
+                sorted(self.keys_to_ignore),
+                sorted(self.tables_to_ignore),
+                sorted(self.constraints_to_ignore),
+            ],
+        )
+
+        self.source_columns = {}
+
+        for c in schema.columns:
+            self.source_columns.setdefault(c.table, []).append(c.name)
+
+        saved = self.saved_schema() if self.reuse_schema else None
+        self.schema_changed = saved is None or saved.fingerprint != fingerprint
+
+        if self.schema_changed:
+            self.generate_ddl(schema, tables, creates_file, indexes_file, foreign_keys_file)
+        else:
+            self.log("Schema for '{}' is unchanged, so reusing its DDL".format(self.source_database_name))
+
+            creates_file.write(saved.creates)
+            indexes_file.write(saved.indexes)
+            foreign_keys_file.write(saved.foreign_keys)
+
+        return fingerprint
+
+    def saved_schema(self):
+        with etl_central_session() as session:
+            result = session.query(EtlDatalakeSchema).filter(
+                EtlDatalakeSchema.database_name == self.source_database_name
+            ).one_or_none()
+
+            session.expunge_all()
+
+            return result
+
+    def save_schema(self, fingerprint, creates_file, indexes_file, foreign_keys_file):
+        """Saves the DDL that the loading database was created
+        from, so that it can be reused while the schema's
+        fingerprint does not change.
+        """
+        ddl = []
+
+        for f in (creates_file, indexes_file, foreign_keys_file):
+            f.seek(0)
+            ddl.append(f.read())
+
+        with etl_central_session() as session:
+            s = session.query(EtlDatalakeSchema).filter(
+                EtlDatalakeSchema.database_name == self.source_database_name
+            ).one_or_none() or EtlDatalakeSchema(database_name=self.source_database_name)
+
+            s.fingerprint = fingerprint
+            s.creates, s.indexes, s.foreign_keys = ddl
+            s.updated_datetime = datetime.datetime.now()
+
+            session.add(s)
+
+    def database_exists(self, database_name):
+        return self.destination.database_exists(database_name)
+
+    def empty_database(self, database_name):
+        self.log("Emptying database '{}'".format(database_name))
+
+        self.destination.empty_database(database_name)
+
+        self.log("Emptying database '{}' COMPLETED".format(database_name))
+
+    def saved_checkpoints(self):
+        with etl_central_session() as session:
+            result = {
+                c.table_name: c for c in session.query(EtlDatalakeCheckpoint).filter(
+                    EtlDatalakeCheckpoint.database_name == self.source_database_name
+                ).all()
+            }
+
+            session.expunge_all()
+
+            return result
+
+    def clear_checkpoints(self):
+        self.load_start_datetime = datetime.datetime.now()
+
+        with etl_central_session() as session:
+            session.query(EtlDatalakeCheckpoint).filter(
+                EtlDatalakeCheckpoint.database_name == self.source_database_name
+            ).delete()
+
+    def save_checkpoint(self, table, records, batches, completed=False):
+        """Records the progress of loading a table, when the table
+        is complete, after its first batch and then only every
+        CHECKPOINT_BATCHES batches or CHECKPOINT_SECONDS seconds.
+
+        Rows loaded after the last checkpoint are not lost if the
+        load fails: prepare_resume continues a partly loaded table
+        after the largest key in the destination, not the
+        checkpoint's count, or empties it and loads it again.  The
+        first batch's checkpoint is what marks the table as partly
+        loaded.  Only the records counted for the table fall behind.
+        """
+        if not self.checkpointing:
+            return
+
+        now = time.monotonic()
+
+        if not completed and batches > 1 and batches % CHECKPOINT_BATCHES:
+            if now - self.checkpoint_times.get(table, now) < CHECKPOINT_SECONDS:
+                return
+
+        self.checkpoint_times[table] = now
+
+        with etl_central_session() as session:
+            c = session.query(EtlDatalakeCheckpoint).filter(
+                EtlDatalakeCheckpoint.database_name == self.source_database_name,
+                EtlDatalakeCheckpoint.table_name == table,
+            ).one_or_none() or EtlDatalakeCheckpoint(
+                database_name=self.source_database_name,
+                table_name=table,
+                load_start_datetime=self.load_start_datetime,
+            )
+
+            c.records = self.resumed_records.get(table, 0) + records
+            c.batches = batches
+            c.completed = completed
+            c.updated_datetime = datetime.datetime.now()
+
+            session.add(c)
+
+    def can_resume(self):
+        checkpoints = self.saved_checkpoints()
+
+        if not checkpoints:
+            return False
+
+        load_start_datetime = min(c.load_start_datetime for c in checkpoints.values())
+
+        if load_start_datetime < datetime.datetime.now() - datetime.timedelta(hours=RESUME_HOURS):
+            self.log('The previous load started too long ago to be resumed, so starting again')
+            return False
+
+        if not self.database_exists(self.loading_database_name):
+            return False
+
+        self.load_start_datetime = load_start_datetime
+
+        return True
+
+    def prepare_resume(self):
+        """Finds the tables that the previous load completed, and
+        where to continue each partly loaded table from.
+        """
+        checkpoints = self.saved_checkpoints()
+
+        self.completed_tables = {t for t, c in checkpoints.items() if c.completed}
+        self.resume_points = {}
+        self.resumed_records = {}
+
+        self.log("Resuming load into '{}' with {:,} tables already loaded".format(
+            self.loading_database_name,
+            len(self.completed_tables),
+        ))
+
+        with closing(self.source_connection()) as source_conn, self.destination.cursor(self.target_database_name) as conn:
+            for t, c in checkpoints.items():
+                if c.completed:
+                    continue
+
+                key = None
+
+                if self.transfer_engine != TransferEngine.BULK_FILES:
+                    key = source.resume_key(source.column_details(source_conn, self.source_database_name, t))
+
+                last_key = self.destination.max_value(conn, t, key) if key else None
+
+                if last_key is None:
+                    self.log("Loading table '{}' again".format(t))
+                    self.destination.delete_rows(conn, t)
+                else:
+                    self.log("Continuing table '{}' after {} {}".format(t, key, last_key))
+                    self.resume_points[t] = (key, last_key)
+                    self.resumed_records[t] = c.records
+
+    def tables_to_transfer(self, source_conn):
+        return [t for t in self.source_tables(source_conn) if t not in self.completed_tables]
+
+    def read_options(self, source_conn, table):
+        """Returns the ordering, and any condition, for reading
+        a table so that it can be continued if the load fails.
+        """
+        if not self.checkpointing:
+            return {}
+
+        key = source.resume_key(source.column_details(source_conn, self.source_database_name, table))
+
+        if not key:
+            return {}
+
+        result = {'order_by': key}
+
+        if table in self.resume_points:
+            result['where'] = '{} > %s'.format(source.quote_mysql(key))
+            result['parameters'] = (self.resume_points[table][1],)
+
+        return result
+
     def re_create_database(self, creates_file):
-        self.log("Creating destination database '{}'".format(self.destination_database_name))
+        self.log("Creating destination database '{}'".format(self.target_database_name))
 
-        with brc_dwh_cursor() as conn:
-            conn.execute(SQL_DROP_DB.format(self.destination_database_name))
-            conn.execute(SQL_CREATE_DB.format(self.destination_database_name))
-            conn.execute(SQL_SIMPLE_RECOVERY.format(self.destination_database_name))
+        self.destination.create_database(self.target_database_name)
 
-        with brc_dwh_cursor(database=self.destination_database_name) as conn:
+        with self.destination.cursor(self.target_database_name) as conn:
             ddl = ''
 
             try:
@@ -116,7 +726,7 @@ class MysqlToMssqlStep(EtlStep):
                     log_level='INFO',
                 )
 
-                conn.execute(ddl)
+                self.destination.execute_ddl(conn, ddl)
 
             except:
                 self.log(
@@ -127,270 +737,632 @@ class MysqlToMssqlStep(EtlStep):
                 email_error(self._name, ddl)
                 raise
 
-        self.log("Creating destination database '{}' COMPLETED".format(self.destination_database_name))
+        self.log("Creating destination database '{}' COMPLETED".format(self.target_database_name))
+
+    def swap_in_loaded_database(self):
+        self.log("Replacing '{}' with '{}'".format(self.destination_database_name, self.loading_database_name))
+
+        # The replaced database was created from the same DDL
+        # if the schema has not changed, so it can be reused
+        keep_old_database = self.reuse_schema and not self.schema_changed
 
-    def create_constraints(self, indexes_file, foreign_keys_file):
-        self.log("Creating constraints for '{}'".format(self.destination_database_name))
+        self.destination.swap(self.loading_database_name, self.destination_database_name, keep_old_database)
+
+        if keep_old_database and self.database_exists(self.loading_database_name):
+            self.empty_database(self.loading_database_name)
+
+        self.target_database_name = self.destination_database_name
+
+        self.log("Replacing '{}' with '{}' COMPLETED".format(self.destination_database_name, self.loading_database_name))
+
+    def source_table_sizes(self):
+        """Returns the approximate size of each source table
+        """
+        with closing(self.source_connection()) as source_conn:
+            return source.table_sizes(source_conn, self.source_database_name)
+
+    def create_constraints(self, indexes_file, foreign_keys_file, sizes=None):
+        """Creates the indexes, and then the foreign keys, using
+        a pool of connections.  Primary keys are created with the
+        tables, so each table's nonclustered indexes are all that
+        remain, and are created in order on one connection.
+        Foreign keys are created once all the indexes exist.
+        The tables are taken largest first when `sizes` is given,
+        and in any order otherwise.
+        """
+        self.log("Creating constraints for '{}'".format(self.target_database_name))
+
+        indexes_file.seek(0)
+        foreign_keys_file.seek(0)
+
+        self.run_table_statements('indexes', 'index', statements_by_table(indexes_file), sizes)
+        self.run_table_statements('foreign keys', 'foreign_key', statements_by_table(foreign_keys_file), sizes)
+
+        self.log("Creating constraints for '{}' COMPLETED".format(self.target_database_name))
+
+    def run_table_statements(self, description, phase, statements, sizes=None):
+        """Runs each table's statements in order, with the tables
+        shared between `constraint_workers` connections, largest
+        first, and logs the time taken by each statement.
+        """
+        start = time.monotonic()
+
+        tables = queue.Queue()
+
+        sizes = sizes or {}
+
+        for t in sorted(statements, key=lambda t: sizes.get(t, 0), reverse=True):
+            tables.put(t)
+
+        stop = threading.Event()
+        timings = []
+
+        def worker():
+            with self.destination.cursor(self.target_database_name) as conn:
+                while not stop.is_set():
+                    try:
+                        table = tables.get_nowait()
+                    except queue.Empty:
+                        return
+
+                    for statement in statements[table]:
+                        seconds = self.run_statement(conn, statement, description)
+                        timings.append((seconds, statement))
+                        self.metrics.add(table, **{phase: seconds})
+
+        with ThreadPoolExecutor(max_workers=self.constraint_workers) as executor:
+            futures = [executor.submit(worker) for _ in range(self.constraint_workers)]
 
-        with brc_dwh_cursor(database=self.destination_database_name) as conn:
             try:
-                indexes_file.seek(0)
-                ddl = indexes_file.read()
-                conn.execute(ddl)
+                for f in as_completed(futures):
+                    f.result()
             except:
-                self.log(
-                    message='Error running creating indexes',
-                    attachment=ddl,
-                    log_level='ERROR',
-                )
+                stop.set()
                 raise
+
+        timings.sort(reverse=True)
+
+        self.log(
+            message="{:,} {} created in {:.1f} seconds".format(len(timings), description, time.monotonic() - start),
+            attachment='\n'.join('{:.1f}s {}'.format(seconds, statement) for seconds, statement in timings),
+        )
+
+    def run_statement(self, conn, statement, description):
+        """Runs a statement and returns the seconds it took"""
+        start = time.monotonic()
+
+        try:
+            self.destination.create_index(conn, statement)
+        except:
+            self.log(
+                message='Error creating {}'.format(description),
+                attachment=statement,
+                log_level='ERROR',
+            )
+            raise
+
+        return time.monotonic() - start
+
+    def transfer_data(self):
+        if self.table_workers > 1:
+            self.transfer_data_in_parallel()
+        elif self.transfer_engine == TransferEngine.EXECUTEMANY:
+            self.transfer_data_using_executemany()
+        elif self.transfer_engine == TransferEngine.BULK_FILES:
+            self.transfer_data_using_bulk_files()
+        else:
+            self.transfer_data_using_inserts()
+
+    def transfer_data_in_parallel(self):
+        self.log("Transferring Data for '{}' using {} workers".format(self.source_database_name, self.table_workers))
+
+        start = time.monotonic()
+        total_records = 0
+
+        with closing(self.source_connection()) as source_conn:
+            sizes = source.table_sizes(source_conn, self.source_database_name)
+            tables = self.tables_to_transfer(source_conn)
+
+        # Start the largest tables first so that they
+        # do not hold up the end of the transfer
+        tables.sort(key=lambda t: sizes.get(t, 0), reverse=True)
+
+        with ThreadPoolExecutor(max_workers=self.table_workers) as executor:
+            futures = [executor.submit(self.transfer_table, t) for t in tables]
+
             try:
-                foreign_keys_file.seek(0)
-                ddl = foreign_keys_file.read()
-                conn.execute(ddl)
+                for f in as_completed(futures):
+                    total_records += f.result()
             except:
-                self.log(
-                    message='Error running creating foreign keys',
-                    attachment=ddl,
-                    log_level='ERROR',
-                )
+                for f in futures:
+                    f.cancel()
                 raise
 
-        self.log("Creating constraints for '{}' COMPLETED".format(self.destination_database_name))
+        self.log_throughput(total_records, time.monotonic() - start)
+        self.log("Transferring Data for '{}' using {} workers COMPLETED".format(self.source_database_name, self.table_workers))
+
+    def transfer_table(self, table):
+        """Transfers a single table using its own source
+        and destination connections.
+        """
+        if self.transfer_engine == TransferEngine.EXECUTEMANY:
+            with closing(self.source_connection()) as source_conn, self.destination.cursor(self.target_database_name) as conn:
+                return self.load_table_using_executemany(
+                    source_conn,
+                    conn,
+                    table,
+                    **self.read_options(source_conn, table),
+                )
+        elif self.transfer_engine == TransferEngine.BULK_FILES:
+            with closing(self.source_connection()) as source_conn, TemporaryDirectory(dir=self.bulk_directory) as directory:
+                return self.load_table_using_bulk_files(source_conn, table, directory)
+        else:
+            return self.dump_inserts(self.data_dump_command(tables=[table], where=self.dump_where(table)))
 
     def transfer_data_using_inserts(self):
         self.log("Dumping Data for '{}'".format(self.source_database_name))
 
-        inserts_file = NamedTemporaryFile(mode='w+t')
-
-        p = subprocess.Popen(
-            [
-                'mysqldump',
-                '--compact',
-                '--complete-insert',
-                '--no-create-info',
-                '--extended-insert=FALSE',
-                '--compatible=mssql',
-                '--skip-comments',
-                '--skip-opt',
-                '--skip-set-charset',
-                '--skip-triggers',
-                '--default-character-set=utf8',
-                '--hex-blob',
-                '--single-transaction',
-                '--quick',
-                '-h',
-                self.source_database_host,
-                '-u',
-                self.source_database_user,
-                '-p' + self.source_database_password,
-                self.source_database_name,
-            ],
-            stdout=inserts_file,
-            universal_newlines=True,
-        )
+        start = time.monotonic()
 
-        p.wait()
-        inserts_file.flush()
-        inserts_file.seek(0)
+        if self.completed_tables or self.resume_points:
+            total_records = 0
 
-        with brc_dwh_cursor(database=self.destination_database_name) as conn:
-            try:
+            with closing(self.source_connection()) as source_conn:
+                tables = self.tables_to_transfer(source_conn)
 
-                BATCH_SIZE = 500
-                total_records = 0
-                inserts = ''
+            # mysqldump applies a condition to every table
+            # dumped, so partly loaded tables are dumped alone
+            for t in self.resume_points:
+                total_records += self.dump_inserts(self.data_dump_command(tables=[t], where=self.dump_where(t)))
 
-                for i, chunk in enumerate(grouper_it(BATCH_SIZE, inserts_file), 1):
-                    try:
-                        inserts = ''.join(chunk)
-
-                        # Remove multiline comments
-                        inserts = re.sub(re.compile(r'/\*(.|[\r\n])*?\*/[;]?', re.MULTILINE), '', inserts)
-                        # Remove single line comments
-                        inserts = re.sub(re.compile(r'^--.*$', re.MULTILINE), '', inserts)
-                        # Remove DELIMITERS
-                        inserts = re.sub(re.compile(r'^DELIMITER.*$', re.MULTILINE), '', inserts)
-
-                        # Placing all inserts in one transaction,
-                        # as opposed to an implicit transaction for
-                        # each insert, speeds things up
-                        inserts = (
-                            'SET ANSI_WARNINGS OFF\n;' + 
-                            'BEGIN TRANSACTION\n' +
-                            'SET NOCOUNT ON\n' +
-                            inserts +
-                            '\nCOMMIT;\n' +
-                            'SET ANSI_WARNINGS ON\n;'
-                        )
-
-                        # Escape stuff
-                        inserts = inserts.replace('\\\\', '{escaped_backslash}')
-                        inserts = inserts.replace('\\\'', '\'\'')
-                        inserts = inserts.replace('\\%', '%')
-                        inserts = inserts.replace('\\_', '_')
-                        inserts = inserts.replace('{escaped_backslash}', '\\\\')
-
-                        # MYSQL uses '0000-00-00' for NULL dates and 
-                        # '0000-00-00 00:00:00' for NULL datetimes
-                        inserts = inserts.replace('\'0000-00-00\'', 'NULL')
-                        inserts = inserts.replace('\'0000-00-00 00:00:00\'', 'NULL')
-
-                        conn.execute(inserts)
-
-                        if i % 100 == 0:
-                            self.log("Approximately {:,} records loaded (batch {})".format(BATCH_SIZE * i, i))
-                    except:
-                        self.log(
-                            message='Error loading data',
-                            attachment=inserts,
-                            log_level='ERROR',
-                        )
-                        email_error(self._name, inserts)
-                        raise
-            finally:
-                inserts_file.close()
-            
+            remaining_tables = [t for t in tables if t not in self.resume_points]
+
+            if remaining_tables:
+                total_records += self.dump_inserts(self.data_dump_command(tables=remaining_tables))
+        else:
+            total_records = self.dump_inserts(self.data_dump_command())
+
+        self.log_throughput(total_records, time.monotonic() - start)
         self.log("Dumping Data for '{}' COMPLETED".format(self.source_database_name))
 
-    def dump_ddl(self, creates_file, indexes_file, foreign_keys_file):
-        self.log("Dumping DDL for '{}'".format(self.source_database_name))
+    def dump_inserts(self, command):
+        if self.stream_dump:
+            with DumpStream(command, batch_size=BATCH_SIZE) as batches:
+                records, last_table = self.load_inserts(itertools.chain.from_iterable(batches))
+
+            for e in batches.errors:
+                self.log(e, log_level='WARNING')
+
+            # The last table is only complete if mysqldump succeeded
+            if last_table:
+                self.save_checkpoint(*last_table, completed=True)
+
+            return records
+        else:
+            with DumpSpool(self.spool_directory, self.spool_compression) as spool, TemporaryFile(mode='w+t') as errors_file:
+                p = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors_file)
+
+                try:
+                    spool.fill(p.stdout)
+                except:
+                    # mysqldump would otherwise be left blocked
+                    # writing to a pipe that nothing reads
+                    p.kill()
+                    raise
+                finally:
+                    p.stdout.close()
+                    returncode = p.wait()
+
+                errors_file.seek(0)
+                errors = [e.rstrip('\n') for e in errors_file if e.strip()]
+
+                # A partial dump would be loaded as if it were complete
+                if returncode != 0:
+                    raise DumpError('{} exited with code {}: {}'.format(command[0], returncode, '\n'.join(errors)))
+
+                for e in errors:
+                    self.log(e, log_level='WARNING')
+
+                self.log("Dump for '{}': {}".format(self.source_database_name, spool.summary()))
+
+                records, last_table = self.load_inserts(spool.lines())
+
+                if last_table:
+                    self.save_checkpoint(*last_table, completed=True)
+
+                return records
+
+    def dump_where(self, table):
+        if table not in self.resume_points:
+            return None
+
+        key, last_key = self.resume_points[table]
+
+        return '{} > {:d}'.format(source.quote_mysql(key), int(last_key))
+
+    def data_dump_command(self, tables=None, where=None):
+        options = []
+
+        if self.checkpointing:
+            # Dump rows in key order, so that a partly
+            # loaded table can be continued
+            options.append('--order-by-primary')
+
+        if where:
+            options.append('--where={}'.format(where))
 
-        mysqldump_command = [
+        return [
             'mysqldump',
             '--compact',
-            '-d',
+            '--complete-insert',
+            '--no-create-info',
+            '--extended-insert=FALSE',
             '--compatible=mssql',
             '--skip-comments',
             '--skip-opt',
             '--skip-set-charset',
             '--skip-triggers',
+            '--default-character-set=utf8',
+            '--hex-blob',
+            '--single-transaction',
+            '--quick',
             '-h',
             self.source_database_host,
             '-u',
             self.source_database_user,
             '-p' + self.source_database_password,
-        ]
+        ] + options + [
+            self.source_database_name,
+        ] + (tables or [])
+
+    def load_inserts(self, lines):
+        total_records = 0
+        batch_count = 0
+        transcoder = InsertTranscoder()
+        table = None
+
+        def line_table(line):
+            nonlocal table
+            m = INSERT_TABLE.match(line)
+
+            if m:
+                table = m.group(1)
+
+            return table
+
+        last_table = None
+
+        with self.destination.cursor(self.target_database_name) as conn:
+            # Each table's batches are sized separately
+            for table_name, table_lines in itertools.groupby(lines, key=line_table):
+                # A table is complete once mysqldump has moved on
+                if last_table:
+                    self.save_checkpoint(*last_table, completed=True)
+
+                sizer = self.batch_sizer()
+                batches = metrics.timed(sizer.batches(table_lines), lambda s: self.metrics.add(table_name, dump=s))
+
+                for batch, batch_bytes in batches:
+                    start = time.monotonic()
+                    inserts = transcoder.feed(''.join(batch))
+                    transformed = time.monotonic()
+                    quarantined = self.execute_inserts(conn, inserts, table_name, batch)
+                    executed = time.monotonic()
+
+                    sizer.record(len(batch) - quarantined, batch_bytes, executed - transformed)
+
+                    records = sum(1 for l in batch if l.startswith('INSERT')) - quarantined
+                    total_records += records
+                    batch_count += 1
+
+                    self.metrics.add(
+                        table_name,
+                        rows=records,
+                        bytes_read=batch_bytes,
+                        bytes_sent=len(inserts),
+                        transform=transformed - start,
+                        execute=executed - transformed,
+                    )
 
-        mysqldump_command.extend(['--ignore-table={}.{}'.format(self.source_database_name, t) for t in self.tables_to_ignore])
+                    if table_name:
+                        self.save_checkpoint(table_name, sizer.total_rows, sizer.batch_count)
 
-        mysqldump_command.append(self.source_database_name)
+                    if batch_count % 100 == 0:
+                        self.log("{:,} records loaded (batch {})".format(total_records, batch_count))
 
-        errors_file = NamedTemporaryFile(mode='w+t')
+                if table_name:
+                    self.log_batches(table_name, sizer)
+                    last_table = (table_name, sizer.total_rows, sizer.batch_count)
 
-        MyOut = subprocess.Popen(
-            mysqldump_command,
-            stdout=subprocess.PIPE,
-            stderr=errors_file,
-            universal_newlines=True,
-        )
-        tables = []
-        current_table_name = ''
+            self.execute_inserts(conn, transcoder.close())
 
-        re_create_table = re.compile(r'CREATE TABLE (?P<table_name>".*")')
-        re_index = re.compile(r'\s*(?P<unique>UNIQUE|) KEY (?P<key_name>".*") (?P<columns>\(.*\))')
-        re_foreign_key = re.compile(r'\s*CONSTRAINT (?P<constraint_name>".*") FOREIGN KEY (?P<columns>\(.*\)) REFERENCES (?P<references>".*" \(.*\))')
+        return total_records, last_table
 
-        ddl = MyOut.stdout.read()
+    def execute_inserts(self, conn, inserts, table=None, lines=None):
+        """Executes a batch of inserts, returning the number
+        of its lines that were quarantined instead of loaded
+        """
+        if not inserts.strip():
+            return 0
 
-        self.log(
-            message='Given DDL',
-            attachment=ddl,
-            log_level='INFO',
-        )
+        try:
+            # When isolating failed rows, an error must
+            # roll back the whole batch
+            self.destination.execute_inserts(conn, inserts, atomic=bool(self.error_budget))
+            return 0
+        except Exception as e:
+            if self.error_budget and lines and self.destination.is_row_error(e):
+                self.destination.rollback(conn)
+                return self.quarantine_failures(table, lines, e, lambda l: self.execute_insert_lines(conn, l))
+
+            self.log(
+                message='Error loading data',
+                attachment=inserts,
+                log_level='ERROR',
+            )
+            email_error(self._name, inserts)
+            raise
+
+    def execute_insert_lines(self, conn, lines):
+        """Loads some of the INSERT statement lines of a failed batch"""
+        transcoder = InsertTranscoder()
+        inserts = transcoder.feed(''.join(lines)) + transcoder.close()
 
-        # Remove multiline comments
-        ddl = re.sub(re.compile(r'/\*(.|[\r\n])*?\*/[;]?', re.MULTILINE), '', ddl)
-        # Remove single line comments
-        ddl = re.sub(re.compile(r'^--.*$', re.MULTILINE), '', ddl)
+        try:
+            self.destination.execute_inserts(conn, inserts, atomic=True)
+        except self.destination.errors:
+            self.destination.rollback(conn)
+            raise
+
+    def quarantine_failures(self, table, items, error, execute, describe=str):
+        """Loads the rows of a failed batch that do not fail on their
+        own, and records those that do in the quarantine table.
+        Returns the number of rows quarantined.
+        """
+        failures = isolation.isolate_failures(items, error, execute, self.destination.is_row_error)
+
+        if not failures:
+            return 0
+
+        created_datetime = datetime.datetime.now()
+
+        with etl_central_session() as session:
+            session.bulk_insert_mappings(EtlDatalakeQuarantine, [
+                dict(
+                    database_name=self.source_database_name,
+                    table_name=table,
+                    load_start_datetime=self.load_start_datetime,
+                    error=str(e),
+                    content=describe(item),
+                    created_datetime=created_datetime,
+                ) for item, e in failures
+            ])
+
+        with self.quarantine_lock:
+            self.quarantined += len(failures)
+            quarantined = self.quarantined
 
         self.log(
-            message='DDL Without comments',
-            attachment=ddl,
-            log_level='INFO',
+            message="{:,} rows of '{}' quarantined ({:,} of {:,} allowed)".format(len(failures), table, quarantined, self.error_budget),
+            attachment='\n\n'.join('{}\n{}'.format(e, describe(item)) for item, e in failures),
+            log_level='WARNING',
         )
 
-        for line in ddl.splitlines():
-            # Remove character set
-            line = re.sub(r'CHARACTER SET [^\s]+\b', ' ', line)
-            line = re.sub(r' COLLATE [^\s]+\b', ' ', line)
-            line = re.sub(r' COLLATE utf8_bin', ' COLLATE SQL_Latin1_General_CP1_CS_AS', line)
-            line = re.sub(r' COMMENT \'.*\'', '', line)
-            line = re.sub(r'SET .*', '', line)
-            line = re.sub(r'DELIMITER.*', '', line)
-
-            # Data type conversions
-            line = re.sub(r'\bunsigned\b', '', line)
-            line = re.sub(r'\bint\(\d+\)', 'INT', line)
-            line = re.sub(r'\bsmallint\(\d+\)', 'SMALLINT', line)
-            line = re.sub(r'\btinyint\(\d+\)', 'TINYINT', line)
-            line = re.sub(r'\bmediumint\(\d+\)', 'INT', line)
-            line = re.sub(r'\bbigint\(\d+\)', 'BIGINT', line)
-            line = re.sub(r'\bdouble\b', ' FLOAT(53)', line)
-            line = re.sub(r'\bbit\(\d+\)', 'BIT', line)
-
-            line = re.sub(r'\btinyblob\b', 'varbinary(max)', line)
-            line = re.sub(r'\bmediumblob\b', 'varbinary(max)', line)
-            line = re.sub(r'\blongblob\b', 'varbinary(max)', line)
-            
-            line = re.sub(r'\bblob\b', 'varchar(max)', line)
-
-            line = re.sub(r'\btinytext\b', 'varchar(max)', line)
-            line = re.sub(r'\bmediumtext\b', 'varchar(max)', line)
-            line = re.sub(r'\blongtext\b', 'varchar(max)', line)
-            line = re.sub(r'\btext\(\d+\)\b', 'varchar(max)', line)
-            line = re.sub(r'\btext\b', 'varchar(max)', line)
-
-            # datetime2 has a range that matches MySQL
-            line = re.sub(r'\bdatetime\b', 'datetime2', line)
-            line = re.sub(r'[^"]\btimestamp\b', 'datetime2', line)
-
-            # Convert ENUMS to VARCHARS(255)
-            line = re.sub(r'enum\(.*\)', 'varchar(255)', line)
-
-            line = re.sub(r'\bDEFAULT b\'', 'DEFAULT \'', line)
-
-            table_name_match = re.match(re_create_table, line)
-
-            if table_name_match:
-                current_table_name = table_name_match.group('table_name')
-                tables.append(current_table_name.strip("\""))
-
-            index_match = re.match(re_index, line)
-            foreign_key_match = re.match(re_foreign_key, line)
-
-            if index_match:
-                if not index_match.group('key_name').replace('"', '') in self.keys_to_ignore:
-                    columns = re.sub(r'\(\d+\)', '', index_match.group('columns')) # Delete strange number in brackets
-                    indexes_file.write(
-                        'CREATE {} INDEX {} ON {} {};\n'.format(
-                            index_match.group('unique'),
-                            index_match.group('key_name'),
-                            current_table_name,
-                            columns,
-                        )
-                    )
-            elif foreign_key_match:
-                if not foreign_key_match.group('constraint_name').replace('"', '') in self.constraints_to_ignore:
-                    foreign_keys_file.write(
-                        'ALTER TABLE {} ADD CONSTRAINT {} FOREIGN KEY {} REFERENCES {};\n'.format(
-                            current_table_name,
-                            foreign_key_match.group('constraint_name'),
-                            foreign_key_match.group('columns'),
-                            foreign_key_match.group('references'),
-                        )
+        if quarantined > self.error_budget:
+            raise Exception("{:,} rows quarantined, which is more than the error budget of {:,}".format(quarantined, self.error_budget))
+
+        return len(failures)
+
+    def transfer_data_using_executemany(self):
+        self.log("Transferring Data for '{}'".format(self.source_database_name))
+
+        start = time.monotonic()
+        total_records = 0
+
+        with closing(self.source_connection()) as source_conn, self.destination.cursor(self.target_database_name) as conn:
+            source.start_snapshot(source_conn)
+
+            for t in self.tables_to_transfer(source_conn):
+                total_records += self.load_table_using_executemany(
+                    source_conn,
+                    conn,
+                    t,
+                    **self.read_options(source_conn, t),
+                )
+
+        self.log_throughput(total_records, time.monotonic() - start)
+        self.log("Transferring Data for '{}' COMPLETED".format(self.source_database_name))
+
+    def load_table_using_executemany(self, source_conn, conn, table, destination_table=None, where=None, parameters=None, order_by=None):
+        columns = self.table_columns(source_conn, table)
+
+        sizer = self.batch_sizer()
+        rows = itertools.chain.from_iterable(metrics.timed(
+            source.read_batches(source_conn, table, columns, BATCH_SIZE, where, parameters, order_by),
+            lambda s: self.metrics.add(table, dump=s),
+        ))
+
+        # Rows merged into an existing table are not part of a full load
+        checkpointing = destination_table is None
+
+        def execute(batch):
+            self.destination.load_batch(conn, destination_table or table, columns, batch)
+
+        for batch, batch_bytes in sizer.batches(rows, size=batching.row_bytes):
+            start = time.monotonic()
+            quarantined = 0
+
+            try:
+                execute(batch)
+            except Exception as e:
+                if not (self.error_budget and self.destination.is_row_error(e)):
+                    self.log(
+                        message="Error loading data into '{}'".format(table),
+                        attachment='\n'.join(repr(r) for r in batch),
+                        log_level='ERROR',
                     )
-            else:
-                if line:
-                    creates_file.write(line + '\n')
-        
-        errors_file.flush()
-        errors_file.seek(0)
-        for e in errors_file:
-            self.log(e, log_level='ERROR')
-        errors_file.close()
-
-        self.log("Dumping DDL for '{}' COMPLETED".format(self.source_database_name))
+                    raise
+
+                quarantined = self.quarantine_failures(table, batch, e, execute, repr)
+
+            seconds = time.monotonic() - start
+            sizer.record(len(batch) - quarantined, batch_bytes, seconds)
+            self.metrics.add(table, rows=len(batch) - quarantined, bytes_read=batch_bytes, bytes_sent=batch_bytes, execute=seconds)
+
+            if checkpointing:
+                self.save_checkpoint(table, sizer.total_rows, sizer.batch_count)
+
+        if checkpointing:
+            self.save_checkpoint(table, sizer.total_rows, sizer.batch_count, completed=True)
+
+        self.log_batches(table, sizer)
+
+        return sizer.total_rows
+
+    def transfer_data_using_bulk_files(self):
+        self.log("Bulk loading Data for '{}'".format(self.source_database_name))
+
+        start = time.monotonic()
+        total_records = 0
+
+        with closing(self.source_connection()) as source_conn, TemporaryDirectory(dir=self.bulk_directory) as directory:
+            source.start_snapshot(source_conn)
+
+            for t in self.tables_to_transfer(source_conn):
+                total_records += self.load_table_using_bulk_files(source_conn, t, directory)
+
+        self.log_throughput(total_records, time.monotonic() - start)
+        self.log("Bulk loading Data for '{}' COMPLETED".format(self.source_database_name))
+
+    def load_table_using_bulk_files(self, source_conn, table, directory):
+        columns = self.table_columns(source_conn, table)
+
+        data_file = os.path.join(directory, '{}.dat'.format(table))
+        format_file = os.path.join(directory, '{}.fmt'.format(table))
+
+        batches = source.read_batches(source_conn, table, columns, BATCH_SIZE)
+
+        try:
+            with self.metrics.timed(table, 'dump'), open(data_file, 'w', encoding='utf-8', newline='') as f:
+                records = bulk.write_data_file(batches, f)
+        except bulk.BulkFormatError as e:
+            # Finish reading the table before it is read again
+            batches.close()
+            os.remove(data_file)
+
+            self.log(
+                "Table '{}' cannot be written to a bulk file ({}), so loading it using executemany".format(table, e),
+                log_level='WARNING',
+            )
+
+            with self.destination.cursor(self.target_database_name) as conn:
+                return self.load_table_using_executemany(source_conn, conn, table)
+
+        with open(format_file, 'w', encoding='utf-8') as f:
+            bulk.write_format_file(columns, f)
+
+        self.save_checkpoint(table, 0, 0)
+
+        file_bytes = os.path.getsize(data_file)
+
+        try:
+            with self.metrics.timed(table, 'execute'):
+                self.bulk_loader(self.target_database_name, table, data_file, format_file)
+
+            self.metrics.add(table, rows=records, bytes_read=file_bytes, bytes_sent=file_bytes)
+        finally:
+            os.remove(data_file)
+            os.remove(format_file)
+
+        self.save_checkpoint(table, records, 1, completed=True)
+
+        return records
+
+    def save_metrics(self, total_seconds, completed):
+        """Saves the metrics of each table loaded, and their totals
+        with the time taken by the whole load.
+        """
+        created_datetime = datetime.datetime.now()
+
+        def metric(table, m, total_seconds=None):
+            result = dict(
+                etl_task_id=self._task_id,
+                database_name=self.source_database_name,
+                table_name=table,
+                load_type=self.load_type,
+                completed=completed,
+                rows=m.rows,
+                bytes_read=m.bytes_read,
+                bytes_sent=m.bytes_sent,
+                total_seconds=total_seconds,
+                created_datetime=created_datetime,
+            )
+
+            for phase, seconds in m.seconds.items():
+                result['{}_seconds'.format(phase)] = seconds
+
+            return result
+
+        with etl_central_session() as session:
+            session.bulk_insert_mappings(
+                EtlDatalakeMetric,
+                [metric(None, self.metrics.totals(), total_seconds)] +
+                [metric(t, m) for t, m in self.metrics.tables.items() if t],
+            )
+
+    def source_tables(self, source_conn):
+        return [
+            t for t in source.base_tables(source_conn, self.source_database_name)
+            if t not in self.tables_to_ignore
+        ]
+
+    def table_columns(self, source_conn, table):
+        """Gets a source table's columns from the schema read for
+        the load, or from the source where it was not read.
+        """
+        if table in self.source_columns:
+            return self.source_columns[table]
+
+        return source.table_columns(source_conn, self.source_database_name, table)
+
+    def source_connection(self):
+        return source.connect(
+            host=self.source_database_host,
+            user=self.source_database_user,
+            password=self.source_database_password,
+            database=self.source_database_name,
+        )
+
+    def batch_sizer(self):
+        return batching.BatchSizer(
+            initial_rows=BATCH_SIZE,
+            max_rows=self.batch_max_rows,
+            max_bytes=self.batch_max_bytes,
+            target_seconds=self.batch_target_seconds,
+        )
+
+    def log_batches(self, table, sizer):
+        self.log("Table '{}' batches: {}".format(table, sizer.summary()))
+
+    def log_throughput(self, records, seconds):
+        self.log("{:,} records loaded using {} in {:.1f} seconds ({:,.0f} records/second)".format(
+            records,
+            self.transfer_engine.value,
+            seconds,
+            records / seconds if seconds else 0,
+        ))
+
+    def generate_ddl(self, schema, tables, creates_file, indexes_file, foreign_keys_file):
+        self.log("Generating DDL for '{}'".format(self.source_database_name))
+
+        generator = DdlGenerator(
+            keys_to_ignore=self.keys_to_ignore,
+            constraints_to_ignore=self.constraints_to_ignore,
+        )
+
+        generator.generate(schema, tables, Ddl(creates_file, indexes_file, foreign_keys_file))
+
+        self.log("Generating DDL for '{}' COMPLETED".format(self.source_database_name))
         return tables
 
 
@@ -405,6 +1377,25 @@ class DataLakeStep(MysqlToMssqlStep):
         source_database_host=ETL_DATABASES_HOST,
         source_database_user=ETL_DATABASES_USERNAME,
         source_database_password=ETL_DATABASES_PASSWORD,
+        stream_dump=True,
+        transfer_engine=None,
+        bulk_directory=None,
+        bulk_loader=None,
+        incremental=False,
+        full_reload_days=7,
+        skip_unchanged=False,
+        table_workers=1,
+        batch_max_rows=None,
+        batch_max_bytes=None,
+        batch_target_seconds=None,
+        resume=False,
+        reuse_schema=True,
+        constraint_workers=None,
+        error_budget=0,
+        destination=None,
+        spool_directory=None,
+        spool_compression=GZIP,
+        temp_disk_budget=None,
     ):
         super().__init__(
             source_database_host=source_database_host,
@@ -417,6 +1408,25 @@ class DataLakeStep(MysqlToMssqlStep):
             keys_to_ignore=keys_to_ignore,
             tables_to_ignore=tables_to_ignore,
             constraints_to_ignore=constraints_to_ignore,
+            stream_dump=stream_dump,
+            transfer_engine=transfer_engine,
+            bulk_directory=bulk_directory,
+            bulk_loader=bulk_loader,
+            incremental=incremental,
+            full_reload_days=full_reload_days,
+            skip_unchanged=skip_unchanged,
+            table_workers=table_workers,
+            batch_max_rows=batch_max_rows,
+            batch_max_bytes=batch_max_bytes,
+            batch_target_seconds=batch_target_seconds,
+            resume=resume,
+            reuse_schema=reuse_schema,
+            constraint_workers=constraint_workers,
+            error_budget=error_budget,
+            destination=destination,
+            spool_directory=spool_directory,
+            spool_compression=spool_compression,
+            temp_disk_budget=temp_disk_budget,
         )
 
 
@@ -474,6 +1484,8 @@ class DataLake_RedCapStep(DataLakeStep):
         super().__init__(
             database_name=database_name,
             source_database_host=REDCAP_DATABASES_HOST,
+            table_workers=4,
+            resume=True,
             keys_to_ignore=[
                 'password_reset_key',
                 'nonrule_proj_record_event_field',
@@ -623,24 +1635,22 @@ class CombinedDataLakeEtl(Etl):
         super().__init__(schedule=Schedule.daily_10_30pm)
 
     def do_etl(self):
-        with ThreadPoolExecutor(max_workers = 4) as executor:
-
-            for step_class in [
-                DataLake_RedCapBriccsStep,
-                DataLake_OpenSpecimenStep,
-                DataLake_BriccsStep,
-                DataLake_BriccsNorthamtonStep,
-                DataLake_CivicrmStep,
-                DataLake_IdentityStep,
-                DataLake_GenvascGpPortalStep,
-                DataLake_RedCapBriccsExtStep,
-                DataLake_RedCapBriccsUoLCrfStep,
-                DataLake_RedCapBriccsUoLSurveyStep,
-                DataLake_RedCapGenvascStep,
-                DataLake_RedCapNationalStep,
-            ]:
-                step = step_class()
-                executor.submit(step.run)
+        steps = [
+            DataLake_RedCapBriccsStep,
+            DataLake_OpenSpecimenStep,
+            DataLake_BriccsStep,
+            DataLake_BriccsNorthamtonStep,
+            DataLake_CivicrmStep,
+            DataLake_IdentityStep,
+            DataLake_GenvascGpPortalStep,
+            DataLake_RedCapBriccsExtStep,
+            DataLake_RedCapBriccsUoLCrfStep,
+            DataLake_RedCapBriccsUoLSurveyStep,
+            DataLake_RedCapGenvascStep,
+            DataLake_RedCapNationalStep,
+        ]
+
+        self.run_steps([s() for s in steps], workers=ETL_DATALAKE_WORKERS)
 
 
 class DataLake_IdentityStep_Etl(Etl):
@@ -684,17 +1694,15 @@ class RedcapDataLakeEtl(Etl):
         super().__init__(schedule=Schedule.never)
 
     def do_etl(self):
-        with ThreadPoolExecutor(max_workers = 4) as executor:
-
-            for step_class in [
-                DataLake_RedCapBriccsStep,
-                DataLake_RedCapBriccsExtStep,
-                DataLake_RedCapBriccsUoLCrfStep,
-                DataLake_RedCapBriccsUoLSurveyStep,
-                DataLake_RedCapGenvascStep,
-                DataLake_RedCapNationalStep,
-            ]:
-                step = step_class()
-                executor.submit(step.run)
+        steps = [
+            DataLake_RedCapBriccsStep,
+            DataLake_RedCapBriccsExtStep,
+            DataLake_RedCapBriccsUoLCrfStep,
+            DataLake_RedCapBriccsUoLSurveyStep,
+            DataLake_RedCapGenvascStep,
+            DataLake_RedCapNationalStep,
+        ]
+
+        self.run_steps([s() for s in steps], workers=ETL_DATALAKE_WORKERS)
 
 
@@ -0,0 +1,32 @@
+CREATE TABLE "civicrm_cache" (
+  "id" INT NOT NULL,
+  "group_name" varchar(32) NOT NULL,
+  "path" varchar(255) DEFAULT NULL,
+  "data" varchar(max) DEFAULT NULL,
+  "component_id" INT DEFAULT NULL,
+  "created_date" datetime2 DEFAULT CURRENT_TIMESTAMP,
+  "expired_date" datetime2 DEFAULT NULL,
+  "blob_data" varbinary(max) DEFAULT NULL,
+  "small_blob" varchar(max) DEFAULT NULL,
+  "flags" varchar(255) DEFAULT NULL,
+  "rate" FLOAT(53) DEFAULT NULL,
+  "year_started" SMALLINT DEFAULT NULL,
+  PRIMARY KEY ("id")
+);
+CREATE TABLE "civicrm_contact" (
+  "id" INT NOT NULL,
+  "contact_type" varchar(64) DEFAULT NULL,
+  "is_opt_out" TINYINT NOT NULL DEFAULT '0',
+  "external_identifier" varchar(64) DEFAULT NULL,
+  "sort_name" varchar(128) DEFAULT NULL,
+  "image_URL" varchar(max) DEFAULT NULL,
+  "hash" varchar(32) DEFAULT NULL,
+  "api_key" varchar(32) DEFAULT NULL,
+  "birth_date" date DEFAULT NULL,
+  "is_deceased" TINYINT NOT NULL DEFAULT '0',
+  "created_date" datetime2 DEFAULT NULL,
+  "modified_date" datetime2 DEFAULT CURRENT_TIMESTAMP,
+  "employer_id" INT DEFAULT NULL,
+  "gender_id" INT DEFAULT NULL,
+  PRIMARY KEY ("id")
+);
@@ -0,0 +1 @@
+ALTER TABLE "civicrm_contact" ADD CONSTRAINT "FK_civicrm_contact_employer_id" FOREIGN KEY ("employer_id") REFERENCES "civicrm_contact" ("id");
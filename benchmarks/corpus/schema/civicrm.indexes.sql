@@ -0,0 +1,7 @@
+CREATE UNIQUE INDEX "UI_group_path_date" ON "civicrm_cache" ("group_name","path","created_date");
+CREATE INDEX "index_expired_date" ON "civicrm_cache" ("expired_date");
+CREATE INDEX "index_group" ON "civicrm_cache" ("group_name");
+CREATE INDEX "FK_civicrm_contact_employer_id" ON "civicrm_contact" ("employer_id");
+CREATE INDEX "index_contact_type" ON "civicrm_contact" ("contact_type");
+CREATE INDEX "index_hash" ON "civicrm_contact" ("hash");
+CREATE INDEX "index_sort_name" ON "civicrm_contact" ("sort_name");
@@ -0,0 +1,31 @@
+CREATE TABLE "demographics_request_data" (
+  "id" INT NOT NULL,
+  "demographics_request_id" INT NOT NULL,
+  "row_number" INT NOT NULL,
+  "nhs_number" varchar(100) DEFAULT NULL,
+  "dob" varchar(100) DEFAULT NULL,
+  "processed_datetime" datetime2 DEFAULT NULL,
+  "created_datetime" datetime2 DEFAULT NULL,
+  "data" varchar(max) DEFAULT NULL,
+  PRIMARY KEY ("id")
+);
+CREATE TABLE "pseudo_random_id" (
+  "id" INT NOT NULL,
+  "pseudo_random_id_provider_id" INT NOT NULL,
+  "ordinal" INT NOT NULL,
+  "unique_code" INT NOT NULL,
+  "check_character" varchar(1) NOT NULL,
+  "full_code" varchar(20) NOT NULL,
+  "last_updated_by_user_id" INT DEFAULT NULL,
+  PRIMARY KEY ("id")
+);
+CREATE TABLE "user" (
+  "id" INT NOT NULL,
+  "email" varchar(255) NOT NULL,
+  "password" varchar(255) DEFAULT NULL,
+  "first_name" varchar(255) DEFAULT NULL,
+  "active" TINYINT DEFAULT NULL,
+  "confirmed_at" datetime2 DEFAULT NULL,
+  "last_update_datetime" datetime2 DEFAULT NULL,
+  PRIMARY KEY ("id")
+);
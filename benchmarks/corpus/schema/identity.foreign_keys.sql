@@ -0,0 +1 @@
+ALTER TABLE "pseudo_random_id" ADD CONSTRAINT "pseudo_random_id_ibfk_1" FOREIGN KEY ("last_updated_by_user_id") REFERENCES "user" ("id");
@@ -0,0 +1,4 @@
+CREATE INDEX "ix_demographics_request_data_demographics_request_id" ON "demographics_request_data" ("demographics_request_id");
+CREATE UNIQUE INDEX "ix_pseudo_random_id_full_code" ON "pseudo_random_id" ("full_code");
+CREATE UNIQUE INDEX "ix_pseudo_random_id_pseudo_random_id_provider_id_unique_code" ON "pseudo_random_id" ("pseudo_random_id_provider_id","unique_code");
+CREATE INDEX "last_updated_by_user_id" ON "pseudo_random_id" ("last_updated_by_user_id");
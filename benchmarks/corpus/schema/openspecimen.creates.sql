@@ -0,0 +1,41 @@
+CREATE TABLE "catissue_specimen" (
+  "IDENTIFIER" BIGINT NOT NULL,
+  "INITIAL_QUANTITY" FLOAT(53) DEFAULT NULL,
+  "PATHOLOGICAL_STATUS" varchar(255) DEFAULT NULL,
+  "LINEAGE" varchar(255) DEFAULT NULL,
+  "SPECIMEN_CLASS" varchar(255) NOT NULL,
+  "SPECIMEN_TYPE" varchar(255) DEFAULT NULL,
+  "CONCENTRATION" FLOAT(53) DEFAULT NULL,
+  "LABEL" varchar(255) DEFAULT NULL,
+  "AVAILABLE" BIT DEFAULT NULL,
+  "BARCODE" varchar(255) DEFAULT NULL,
+  "COMMENTS" varchar(max) DEFAULT NULL,
+  "ACTIVITY_STATUS" varchar(50) DEFAULT NULL,
+  "COLLECTION_STATUS" varchar(50) DEFAULT NULL,
+  "CREATED_ON" datetime2 DEFAULT NULL,
+  "SPECIMEN_COLLECTION_GROUP_ID" BIGINT DEFAULT NULL,
+  "PARENT_SPECIMEN_ID" BIGINT DEFAULT NULL,
+  "IS_AVAILABLE" BIT DEFAULT '1',
+  "FREEZE_THAW_CYCLES" INT DEFAULT '0',
+  PRIMARY KEY ("IDENTIFIER")
+);
+CREATE TABLE "os_audit_revisions" (
+  "REV" BIGINT NOT NULL,
+  "REVTSTMP" datetime2 DEFAULT NULL,
+  "USER_ID" BIGINT DEFAULT NULL,
+  "IP_ADDRESS" varchar(64) DEFAULT NULL,
+  "text" varchar(max) DEFAULT NULL,
+  "datetime" datetime2 DEFAULT NULL,
+  PRIMARY KEY ("REV")
+);
+CREATE TABLE "os_storage_container_positions" (
+  "IDENTIFIER" BIGINT NOT NULL,
+  "STORAGE_CONTAINER_ID" BIGINT NOT NULL,
+  "POS_ONE" INT NOT NULL,
+  "POS_TWO" INT NOT NULL,
+  "POS_ONE_STR" varchar(255) NOT NULL,
+  "OCCUPYING_SPECIMEN_ID" BIGINT DEFAULT NULL,
+  "BLOCK_ENTITY_TYPE" varchar(255) DEFAULT NULL,
+  "RESERVATION_TIME" datetime2 DEFAULT NULL,
+  PRIMARY KEY ("IDENTIFIER")
+);
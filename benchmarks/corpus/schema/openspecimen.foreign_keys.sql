@@ -0,0 +1,2 @@
+ALTER TABLE "catissue_specimen" ADD CONSTRAINT "FK1674810456906F39" FOREIGN KEY ("PARENT_SPECIMEN_ID") REFERENCES "catissue_specimen" ("IDENTIFIER");
+ALTER TABLE "os_storage_container_positions" ADD CONSTRAINT "FK_OCC_SPMN_ID" FOREIGN KEY ("OCCUPYING_SPECIMEN_ID") REFERENCES "catissue_specimen" ("IDENTIFIER");
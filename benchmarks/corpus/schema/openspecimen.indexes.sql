@@ -0,0 +1,3 @@
+CREATE INDEX "FK1674810456906F39" ON "catissue_specimen" ("PARENT_SPECIMEN_ID");
+CREATE INDEX "FK_SPECIMEN_COLL_GROUP" ON "catissue_specimen" ("SPECIMEN_COLLECTION_GROUP_ID");
+CREATE INDEX "fk_site_cont_id" ON "os_storage_container_positions" ("STORAGE_CONTAINER_ID");
@@ -0,0 +1,69 @@
+CREATE TABLE "redcap_data" (
+  "project_id" INT NOT NULL DEFAULT '0',
+  "event_id" INT DEFAULT NULL,
+  "record" varchar(100) DEFAULT NULL,
+  "field_name" varchar(100) DEFAULT NULL,
+  "value" varchar(max) DEFAULT NULL,
+  "instance" SMALLINT DEFAULT NULL
+);
+CREATE TABLE "redcap_edocs_metadata" (
+  "doc_id" INT NOT NULL,
+  "stored_name" varchar(100) DEFAULT NULL,
+  "mime_type" varchar(255) DEFAULT NULL,
+  "doc_name" varchar(255) DEFAULT NULL,
+  "doc_size" INT DEFAULT NULL,
+  "file_extension" varchar(10) DEFAULT NULL,
+  "gzipped" INT NOT NULL DEFAULT '0',
+  "project_id" INT DEFAULT NULL,
+  "stored_date" datetime2 DEFAULT NULL,
+  "delete_date" datetime2 DEFAULT NULL,
+  "date_deleted_server" datetime2 DEFAULT NULL,
+  PRIMARY KEY ("doc_id")
+);
+CREATE TABLE "redcap_external_modules_log" (
+  "log_id" BIGINT NOT NULL,
+  "timestamp" datetime2 DEFAULT CURRENT_TIMESTAMP,
+  "ui_id" INT DEFAULT NULL,
+  "ip" varchar(100) DEFAULT NULL,
+  "external_module_id" INT DEFAULT NULL,
+  "project_id" INT DEFAULT NULL,
+  "record" varchar(100) DEFAULT NULL,
+  "message" varchar(max) NOT NULL,
+  PRIMARY KEY ("log_id")
+);
+CREATE TABLE "redcap_log_event" (
+  "log_event_id" INT NOT NULL,
+  "project_id" INT NOT NULL DEFAULT '0',
+  "ts" BIGINT DEFAULT NULL,
+  "user" varchar(255) DEFAULT NULL,
+  "ip" varchar(100) DEFAULT NULL,
+  "page" varchar(255) DEFAULT NULL,
+  "event" varchar(255) DEFAULT NULL,
+  "object_type" varchar(128) DEFAULT NULL,
+  "sql_log" varchar(max) DEFAULT NULL,
+  "pk" varchar(max) DEFAULT NULL,
+  "event_id" INT DEFAULT NULL,
+  "data_values" varchar(max) DEFAULT NULL,
+  "description" varchar(max) DEFAULT NULL,
+  "legacy" INT NOT NULL DEFAULT '0',
+  "change_reason" varchar(max) DEFAULT NULL,
+  PRIMARY KEY ("log_event_id")
+);
+CREATE TABLE "redcap_user_information" (
+  "ui_id" INT NOT NULL,
+  "username" varchar(191) DEFAULT NULL,
+  "user_email" varchar(255) DEFAULT NULL,
+  "user_firstname" varchar(255) DEFAULT NULL,
+  "user_creation" datetime2 DEFAULT NULL,
+  "user_lastlogin" datetime2 DEFAULT NULL,
+  "super_user" INT NOT NULL DEFAULT '0',
+  "user_sponsor" varchar(255) DEFAULT NULL,
+  "allow_create_db" INT NOT NULL DEFAULT '1',
+  "email_verify_code" varchar(20) DEFAULT NULL,
+  "api_token" varchar(64) DEFAULT NULL,
+  "two_factor_auth_secret" varchar(20) DEFAULT NULL,
+  "display_on_email_users" INT NOT NULL DEFAULT '1',
+  "messaging_email_preference" varchar(255) NOT NULL DEFAULT '4_HOURS',
+  "messaging_email_ts" datetime2 DEFAULT NULL,
+  PRIMARY KEY ("ui_id")
+);
@@ -0,0 +1 @@
+ALTER TABLE "redcap_external_modules_log" ADD CONSTRAINT "redcap_external_modules_log_ibfk_1" FOREIGN KEY ("ui_id") REFERENCES "redcap_user_information" ("ui_id");
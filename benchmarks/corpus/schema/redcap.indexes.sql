@@ -0,0 +1,20 @@
+CREATE INDEX "event_id_instance" ON "redcap_data" ("event_id","instance");
+CREATE INDEX "proj_record_field" ON "redcap_data" ("project_id","record","field_name");
+CREATE INDEX "project_field" ON "redcap_data" ("project_id","field_name");
+CREATE INDEX "date_deleted" ON "redcap_edocs_metadata" ("delete_date","date_deleted_server");
+CREATE INDEX "project_id" ON "redcap_edocs_metadata" ("project_id");
+CREATE INDEX "external_module_id" ON "redcap_external_modules_log" ("external_module_id");
+CREATE INDEX "record" ON "redcap_external_modules_log" ("record");
+CREATE INDEX "redcap_log_redcap_projects_record" ON "redcap_external_modules_log" ("project_id","record");
+CREATE INDEX "ui_id" ON "redcap_external_modules_log" ("ui_id");
+CREATE INDEX "description" ON "redcap_log_event" ("description");
+CREATE INDEX "event_project" ON "redcap_log_event" ("event","project_id");
+CREATE INDEX "object_type" ON "redcap_log_event" ("object_type");
+CREATE INDEX "pk" ON "redcap_log_event" ("pk");
+CREATE INDEX "project_user" ON "redcap_log_event" ("project_id","user");
+CREATE INDEX "ts" ON "redcap_log_event" ("ts");
+CREATE INDEX "user" ON "redcap_log_event" ("user");
+CREATE INDEX "user_project" ON "redcap_log_event" ("user","project_id");
+CREATE INDEX "user_email" ON "redcap_user_information" ("user_email");
+CREATE INDEX "user_lastlogin" ON "redcap_user_information" ("user_lastlogin");
+CREATE UNIQUE INDEX "username" ON "redcap_user_information" ("username");
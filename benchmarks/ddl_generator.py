@@ -0,0 +1,133 @@
+"""DDL generator golden output check and benchmark
+
+Generates the DDL for each information_schema fixture in
+corpus/schema and compares the output with the expected .creates.sql,
+.indexes.sql and .foreign_keys.sql files, then times the generation
+per column.
+
+Each fixture holds the rows that MysqlToMssqlStep reads from the
+TABLES, COLUMNS, STATISTICS and KEY_COLUMN_USAGE views, in the order
+of the queries in api.datalake.source.
+
+    python -m benchmarks.ddl_generator [--update] [--repeat N]
+
+--update rewrites the expected output from the current generator.
+"""
+import argparse
+import difflib
+import io
+import json
+import os
+import sys
+import time
+from api.datalake.ddl import Ddl, DdlGenerator
+from api.datalake.source import Schema, SchemaColumn, SchemaIndex, SchemaConstraint
+
+CORPUS_DIRECTORY = os.path.join(os.path.dirname(__file__), 'corpus', 'schema')
+
+# Keys and constraints ignored by the corresponding DataLake steps
+IGNORED = {
+    'redcap': {
+        'keys_to_ignore': ['api_token', 'user_comments', 'email_verify_code', 'message'],
+        'constraints_to_ignore': [],
+    },
+    'openspecimen': {
+        'keys_to_ignore': ['barcode', 'cat_spec_cp_id_label_uq'],
+        'constraints_to_ignore': ['fk_spec_coll_event', 'fk_site_cont_id'],
+    },
+    'civicrm': {
+        'keys_to_ignore': ['index_image_URL_128', 'UI_external_identifier'],
+        'constraints_to_ignore': [],
+    },
+    'identity': {
+        'keys_to_ignore': ['udx__user__email'],
+        'constraints_to_ignore': [],
+    },
+}
+
+
+def load_schema(path):
+    """Reads an information_schema fixture, returning the base
+    tables and the schema as read by source.read_schema
+    """
+    with open(path) as f:
+        fixture = json.load(f)
+
+    return fixture['TABLES'], Schema(
+        columns=[SchemaColumn(*r) for r in fixture['COLUMNS']],
+        indexes=[SchemaIndex(*r) for r in fixture['STATISTICS']],
+        constraints=[SchemaConstraint(*r) for r in fixture['KEY_COLUMN_USAGE']],
+    )
+
+
+def corpus():
+    for f in sorted(os.listdir(CORPUS_DIRECTORY)):
+        name, extension = os.path.splitext(f)
+
+        if extension == '.json':
+            yield (name,) + load_schema(os.path.join(CORPUS_DIRECTORY, f))
+
+
+def generate(name, tables, schema):
+    ddl = Ddl(io.StringIO(), io.StringIO(), io.StringIO())
+    DdlGenerator(**IGNORED.get(name, {})).generate(schema, tables, ddl)
+    return ddl
+
+
+def check(update):
+    failures = 0
+
+    for name, tables, schema in corpus():
+        ddl = generate(name, tables, schema)
+
+        for part in Ddl._fields:
+            expected_path = os.path.join(CORPUS_DIRECTORY, '{}.{}.sql'.format(name, part))
+            actual = getattr(ddl, part).getvalue()
+
+            if update:
+                with open(expected_path, 'w') as f:
+                    f.write(actual)
+                continue
+
+            with open(expected_path) as f:
+                expected = f.read()
+
+            if actual != expected:
+                failures += 1
+                print('{}.{} differs from the expected output:'.format(name, part))
+                sys.stdout.writelines(difflib.unified_diff(
+                    expected.splitlines(keepends=True),
+                    actual.splitlines(keepends=True),
+                    'expected',
+                    'actual',
+                ))
+
+    return failures
+
+
+def benchmark(repeat):
+    schemas = list(corpus())
+    column_count = sum(len(schema.columns) for _, _, schema in schemas) * repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for name, tables, schema in schemas:
+            generate(name, tables, schema)
+    seconds = time.perf_counter() - start
+
+    print('{:,} columns'.format(column_count))
+    print('generator: {:.2f} us/column'.format(seconds / column_count * 1e6))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check and benchmark the DDL generator.')
+    parser.add_argument('--update', action='store_true', help='Rewrite the expected output')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    failures = check(args.update)
+
+    if failures:
+        sys.exit(1)
+
+    benchmark(args.repeat)
@@ -0,0 +1,173 @@
+"""INSERT transcoder check and micro-benchmark
+
+Checks the transcoder against a set of statements with known T-SQL
+output, and its single substitution for batches of ordinary statements
+against its state machine, then times it against the regular
+expression and replace passes that it replaced, on generated mysqldump
+INSERT statements fed in batches of the size used by the datalake
+steps.
+
+    python -m benchmarks.insert_transcoder [--rows N] [--repeat N]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from api.datalake.inserts import InsertTranscoder
+
+# Lines per batch, as used by the datalake steps
+BATCH_SIZE = 500
+
+INSERT = 'INSERT INTO "redcap_data" ("project_id", "record", "field_name", "value", "created") VALUES ({});\n'
+
+# mysqldump output and the T-SQL that it should become
+CASES = [
+    (
+        INSERT.format("1,'it\\'s','a \\\\ path','50\\% a\\_b','2020-01-01 00:00:00'"),
+        INSERT.format("1,'it''s','a \\ path','50% a_b','2020-01-01 00:00:00'"),
+    ),
+    (
+        INSERT.format("2,'0000-00-00','0000-00-00 00:00:00','x 0000-00-00',NULL"),
+        INSERT.format("2,NULL,NULL,'x 0000-00-00',NULL"),
+    ),
+    (
+        INSERT.format("3,'line\\none','tab\\tend','/* kept */','-- kept'"),
+        INSERT.format("3,'line\none','tab\tend','/* kept */','-- kept'"),
+    ),
+    (
+        INSERT.format("4,'ends with \\\\','\\\\\\nnext','nul\\0byte',0x00FF"),
+        INSERT.format("4,'ends with \\','\\' + '\nnext','nul' + CHAR(0) + 'byte',0x00FF"),
+    ),
+    (
+        '/*!40000 ALTER TABLE "redcap_data" DISABLE KEYS */;\n',
+        '\n',
+    ),
+    (
+        'INSERT INTO "it\'s" ("a""b") VALUES (\'0000-00-00\',\'a "quoted" \\\'word\\\'\');\n',
+        'INSERT INTO "it\'s" ("a""b") VALUES (NULL,\'a "quoted" \'\'word\'\'\');\n',
+    ),
+    (
+        INSERT.format("5,/* inline */'x',''") + INSERT.format("6,'y\\'s',NULL"),
+        INSERT.format("5,'x',''") + INSERT.format("6,'y''s',NULL"),
+    ),
+]
+
+
+def legacy_transcode(inserts):
+    # The conversion previously done by MysqlToMssqlStep.load_inserts
+    inserts = re.sub(re.compile(r'/\*(.|[\r\n])*?\*/[;]?', re.MULTILINE), '', inserts)
+    inserts = re.sub(re.compile(r'^--.*$', re.MULTILINE), '', inserts)
+    inserts = re.sub(re.compile(r'^DELIMITER.*$', re.MULTILINE), '', inserts)
+
+    inserts = inserts.replace('\\\\', '{escaped_backslash}')
+    inserts = inserts.replace('\\\'', '\'\'')
+    inserts = inserts.replace('\\%', '%')
+    inserts = inserts.replace('\\_', '_')
+    inserts = inserts.replace('{escaped_backslash}', '\\\\')
+
+    inserts = inserts.replace('\'0000-00-00\'', 'NULL')
+    inserts = inserts.replace('\'0000-00-00 00:00:00\'', 'NULL')
+
+    return inserts
+
+
+def check(lines):
+    failures = 0
+
+    for source, expected in CASES:
+        transcoder = InsertTranscoder()
+        actual = transcoder.feed(source) + transcoder.close()
+
+        if actual != expected:
+            failures += 1
+            print('{!r}\n  expected {!r}\n  actual   {!r}'.format(source, expected, actual))
+
+    # Batches of ordinary statements are converted by a single
+    # substitution, which must agree with the state machine
+    for batch in batches(lines):
+        transcoder = InsertTranscoder()
+        ordinary = transcoder.feed(batch)
+
+        if ordinary != InsertTranscoder()._transcode_by_state(batch):
+            failures += 1
+            print('ordinary statements converted differently by the state machine:\n{}'.format(batch[:1000]))
+
+    return failures
+
+
+def random_value(rng):
+    kind = rng.random()
+
+    if kind < 0.1:
+        return 'NULL'
+    if kind < 0.2:
+        return rng.choice(["'0000-00-00'", "'0000-00-00 00:00:00'"])
+    if kind < 0.3:
+        return str(rng.randint(0, 1000000))
+    if kind < 0.35:
+        return '0x' + ''.join(rng.choice('0123456789ABCDEF') for _ in range(rng.randint(2, 64)))
+
+    words = []
+
+    for _ in range(rng.randint(1, 40)):
+        word = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(1, 10)))
+
+        if rng.random() < 0.01:
+            word += rng.choice(["\\'", '\\\\', '\\n', '\\r\\n', '\\"', '\\%', '\\_'])
+
+        words.append(word)
+
+    return "'" + ' '.join(words) + "'"
+
+
+def generate(rows):
+    rng = random.Random(0)
+
+    return [
+        INSERT.format(','.join(random_value(rng) for _ in range(5)))
+        for _ in range(rows)
+    ]
+
+
+def batches(lines):
+    for i in range(0, len(lines), BATCH_SIZE):
+        yield ''.join(lines[i:i + BATCH_SIZE])
+
+
+def benchmark(lines, repeat):
+    rows = len(lines)
+    megabytes = sum(len(l) for l in lines) * repeat / 1e6
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        transcoder = InsertTranscoder()
+        for batch in batches(lines):
+            transcoder.feed(batch)
+        transcoder.close()
+    transcoder_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for batch in batches(lines):
+            legacy_transcode(batch)
+    legacy_seconds = time.perf_counter() - start
+
+    print('{:,} rows, {:.1f} MB'.format(rows * repeat, megabytes))
+    print('transcoder: {:.1f} MB/s'.format(megabytes / transcoder_seconds))
+    print('legacy:     {:.1f} MB/s'.format(megabytes / legacy_seconds))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check and benchmark the INSERT transcoder.')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    lines = generate(args.rows)
+    failures = check(lines)
+
+    if failures:
+        sys.exit(1)
+
+    benchmark(lines, args.repeat)
@@ -0,0 +1,310 @@
+"""End-to-end datalake pipeline benchmark
+
+Generates a synthetic mysqldump data dump shaped like the databases
+loaded into the datalake, for the schema in corpus/pipeline/schema.json - a REDCap style EAV table, wide
+text columns, hex blobs, zero dates and escaped strings - and runs it
+through each stage of the pipeline that does not need a database:
+
+    ddl         DDL generation from the schema's information_schema
+                rows and grouping of the index and foreign key
+                statements by table
+    transcode   INSERT statement transcoding, in fixed size batches
+    load        MysqlToMssqlStep.load_inserts: grouping by table,
+                adaptive batching, transcoding and executing through
+                an MssqlDestination whose cursor records the statements
+
+The rows and bytes per second and the peak memory of each stage are
+reported, along with a digest of each stage's output, and compared
+with the results kept in results/pipeline.json.  A stage whose output
+has changed fails the run, as does one that has slowed down by more
+than --max-slowdown percent, when given.
+
+    python -m benchmarks.pipeline [--rows N] [--repeat N] [--save] [--max-slowdown PERCENT]
+
+--save keeps the current results as those to compare against.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from api.datalake.ddl import Ddl, DdlGenerator, statements_by_table
+from api.datalake.destination import MssqlDestination
+from api.datalake.inserts import InsertTranscoder
+from api.uhl_etl.mysql_to_mssql.datalake import MysqlToMssqlStep
+from benchmarks.ddl_generator import load_schema
+
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), 'results', 'pipeline.json')
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), 'corpus', 'pipeline', 'schema.json')
+
+# Lines per batch, as used by the datalake steps
+BATCH_SIZE = 500
+
+WIDE_COLUMNS = 30
+
+WORDS = [
+    'patient', 'visit', 'consent', 'sample', 'baseline', 'follow', 'up', 'blood',
+    'pressure', 'systolic', 'diastolic', 'withdrawn', 'eligible', 'screening',
+    'randomised', 'placebo', 'dose', 'adverse', 'event', 'serious', 'resolved',
+]
+
+ESCAPED = ["\\'", '\\\\', '\\n', '\\r\\n', '\\"', '\\t', '\\0', '\\%', '\\_']
+
+
+def insert(table, columns, values):
+    return 'INSERT INTO "{}" ({}) VALUES ({});\n'.format(
+        table,
+        ','.join('"{}"'.format(c) for c in columns),
+        ','.join(values),
+    )
+
+
+def text(rng, words, escape_probability=0.0):
+    result = []
+
+    for _ in range(words):
+        w = rng.choice(WORDS)
+
+        if rng.random() < escape_probability:
+            w += rng.choice(ESCAPED)
+
+        result.append(w)
+
+    return "'" + ' '.join(result) + "'"
+
+
+def date(rng, time_part):
+    if rng.random() < 0.1:
+        return "'0000-00-00 00:00:00'" if time_part else "'0000-00-00'"
+
+    d = '{:04d}-{:02d}-{:02d}'.format(rng.randint(2010, 2023), rng.randint(1, 12), rng.randint(1, 28))
+
+    if time_part:
+        d += ' {:02d}:{:02d}:{:02d}'.format(rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59))
+
+    return "'" + d + "'"
+
+
+def data_lines(rows):
+    """Generates mysqldump INSERT statements for about `rows` rows,
+    most of them in the EAV table, as real REDCap dumps are.
+    """
+    rng = random.Random(0)
+    projects = max(rows // 5000, 1)
+
+    for p in range(1, projects + 1):
+        yield insert('redcap_projects', ['project_id', 'project_name', 'app_title', 'creation_time', 'production_time', 'status'], [
+            str(p), "'project_{}'".format(p), text(rng, 6, 0.2), date(rng, True), date(rng, True), str(rng.randint(0, 2)),
+        ])
+
+    columns = ['project_id', 'event_id', 'record', 'field_name', 'value', 'instance']
+
+    for _ in range(rows * 80 // 100):
+        yield insert('redcap_data', columns, [
+            str(rng.randint(1, projects)),
+            str(rng.randint(1, 50)),
+            "'{}'".format(rng.randint(1, 5000)),
+            "'{}_{}'".format(rng.choice(WORDS), rng.randint(1, 200)),
+            text(rng, rng.choice([1, 1, 1, 2, 5, 40]), 0.02),
+            'NULL' if rng.random() < 0.9 else str(rng.randint(1, 5)),
+        ])
+
+    columns = ['id'] + ['text_{:02d}'.format(i) for i in range(WIDE_COLUMNS)] + ['notes']
+
+    for i in range(1, rows * 5 // 100 + 1):
+        yield insert('wide_text', columns, [str(i)] + [
+            'NULL' if rng.random() < 0.3 else text(rng, rng.randint(1, 20), 0.01) for _ in range(WIDE_COLUMNS)
+        ] + [text(rng, rng.randint(50, 400), 0.05)])
+
+    columns = ['doc_id', 'project_id', 'doc_name', 'mime_type', 'content', 'stored_date']
+
+    for i in range(1, rows * 1 // 100 + 1):
+        size = rng.choice([16, 256, 4096, 32768])
+        yield insert('document', columns, [
+            str(i), str(rng.randint(1, projects)), "'document_{}.pdf'".format(i), "'application/pdf'",
+            '0x' + rng.getrandbits(size * 8).to_bytes(size, 'big').hex().upper(), date(rng, True),
+        ])
+
+    columns = ['id', 'participant', 'visit_date', 'recorded', 'last_modified', 'status', 'comment']
+
+    for i in range(1, rows * 14 // 100 + 1):
+        yield insert('visit', columns, [
+            str(i), "'BPt{:08d}'".format(rng.randint(1, 99999999)), date(rng, False), date(rng, True), date(rng, True),
+            rng.choice(["'booked'", "'attended'", "'missed'", 'NULL']), text(rng, rng.randint(1, 30), 0.3),
+        ])
+
+
+class RecordingCursor():
+    """Stands in for a pyodbc cursor, recording what is executed"""
+
+    def __init__(self):
+        self.executes = 0
+        self.bytes = 0
+        self._hash = hashlib.sha256()
+
+    def execute(self, sql):
+        self.executes += 1
+        self.bytes += len(sql)
+        self._hash.update(sql.encode('utf8'))
+
+    def digest(self):
+        return self._hash.hexdigest()
+
+
+def run_ddl(schema, data):
+    tables, rows = schema
+    result = Ddl(io.StringIO(), io.StringIO(), io.StringIO())
+    DdlGenerator().generate(rows, tables, result)
+
+    for part in (result.indexes, result.foreign_keys):
+        part.seek(0)
+        statements_by_table(part)
+
+    return len(rows.columns), ''.join(p.getvalue() for p in result)
+
+
+def run_transcode(schema, data):
+    transcoder = InsertTranscoder()
+    h = hashlib.sha256()
+
+    for i in range(0, len(data), BATCH_SIZE):
+        h.update(transcoder.feed(''.join(data[i:i + BATCH_SIZE])).encode('utf8'))
+
+    h.update(transcoder.close().encode('utf8'))
+
+    return len(data), h.hexdigest()
+
+
+def run_load(schema, data):
+    cursor = RecordingCursor()
+
+    @contextmanager
+    def recording_cursor(database=None):
+        yield cursor
+
+    step = MysqlToMssqlStep(
+        source_database_host='localhost',
+        source_database_user='benchmark',
+        source_database_password='',
+        database_name='pipeline',
+        destination_database_host='localhost',
+        destination_database_user='benchmark',
+        destination_database_password='',
+        destination=MssqlDestination(recording_cursor),
+    )
+
+    records, last_table = step.load_inserts(iter(data))
+
+    rows = ' '.join('{} {}'.format(t, m.rows) for t, m in sorted(step.metrics.tables.items()))
+
+    return records, '{} {} executes {}'.format(cursor.digest(), cursor.executes, rows)
+
+
+STAGES = [
+    ('ddl', run_ddl, lambda schema, data: os.path.getsize(SCHEMA_PATH)),
+    ('transcode', run_transcode, lambda schema, data: sum(len(l) for l in data)),
+    ('load', run_load, lambda schema, data: sum(len(l) for l in data)),
+]
+
+
+def benchmark(rows, repeat):
+    schema = load_schema(SCHEMA_PATH)
+    data = list(data_lines(rows))
+    results = {}
+
+    for name, run, size in STAGES:
+        seconds = None
+
+        # Best of `repeat` runs, without tracemalloc slowing them down
+        for _ in range(repeat):
+            start = time.perf_counter()
+            count, output = run(schema, data)
+            elapsed = time.perf_counter() - start
+            seconds = min(seconds or elapsed, elapsed)
+
+        tracemalloc.start()
+        run(schema, data)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results[name] = {
+            'lines': count,
+            'bytes': size(schema, data),
+            'seconds': seconds,
+            'lines_per_second': count / seconds,
+            'bytes_per_second': size(schema, data) / seconds,
+            'peak_bytes': peak_bytes,
+            'digest': hashlib.sha256(output.encode('utf8')).hexdigest(),
+        }
+
+    return results
+
+
+def compare(results, saved, max_slowdown):
+    failures = 0
+
+    for name, r in results.items():
+        s = saved.get(name)
+
+        print('{:<10} {:>12,.0f} lines/s {:>8,.1f} MB/s {:>8,.1f} MB peak'.format(
+            name,
+            r['lines_per_second'],
+            r['bytes_per_second'] / 1e6,
+            r['peak_bytes'] / 1e6,
+        ), end='')
+
+        if not s:
+            print()
+            continue
+
+        change = (r['bytes_per_second'] / s['bytes_per_second'] - 1) * 100
+        print('  {:+.0f}% speed, {:+.0f}% memory'.format(change, (r['peak_bytes'] / s['peak_bytes'] - 1) * 100))
+
+        if r['digest'] != s['digest']:
+            failures += 1
+            print('  output differs from the saved results')
+
+        if max_slowdown is not None and change < -max_slowdown:
+            failures += 1
+            print('  slower than allowed by --max-slowdown')
+
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the datalake pipeline on synthetic dumps.')
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', action='store_true', help='Keep these results to compare against')
+    parser.add_argument('--max-slowdown', type=float, help='Fail when a stage is this many percent slower')
+    args = parser.parse_args()
+
+    results = benchmark(args.rows, args.repeat)
+
+    saved = {}
+
+    if os.path.exists(RESULTS_PATH):
+        with open(RESULTS_PATH) as f:
+            kept = json.load(f)
+
+        if kept['rows'] == args.rows:
+            saved = kept['stages']
+        else:
+            print('Saved results are for {:,} rows, so not comparing'.format(kept['rows']))
+
+    failures = compare(results, saved, args.max_slowdown)
+
+    if args.save:
+        os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+
+        with open(RESULTS_PATH, 'w') as f:
+            json.dump({'rows': args.rows, 'python': platform.python_version(), 'stages': results}, f, indent=4)
+            f.write('\n')
+    elif failures:
+        sys.exit(1)
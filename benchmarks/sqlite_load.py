@@ -0,0 +1,110 @@
+"""End-to-end datalake load into SQLite
+
+Loads the pipeline benchmark's synthetic dump into an in-memory SQLite
+database through MysqlToMssqlStep, with a SqliteDestination in place of
+SQL Server: the DDL is generated from corpus/pipeline/schema.json, the
+database created, the INSERT statements loaded by load_inserts, the
+indexes and foreign keys created by create_constraints and the loaded
+database swapped in.  The rows in each table, as given by the
+destination's row_counts, and the indexes created are then checked
+against the dump and the generated DDL.
+
+    python -m benchmarks.sqlite_load [--rows N]
+"""
+import argparse
+import sys
+import tempfile
+from collections import Counter
+from api.datalake.ddl import statements_by_table
+from api.datalake.destination import SqliteDestination
+from api.uhl_etl.mysql_to_mssql.datalake import MysqlToMssqlStep
+from benchmarks.ddl_generator import load_schema
+from benchmarks.pipeline import SCHEMA_PATH, data_lines
+
+
+def load(rows):
+    """Loads the dump through a step, returning the step,
+    the dump and the generated index statements
+    """
+    tables, schema = load_schema(SCHEMA_PATH)
+    data = list(data_lines(rows))
+
+    step = MysqlToMssqlStep(
+        source_database_host='localhost',
+        source_database_user='check',
+        source_database_password='',
+        database_name='pipeline',
+        destination_database_host='localhost',
+        destination_database_user='check',
+        destination_database_password='',
+        destination=SqliteDestination(),
+    )
+
+    with tempfile.TemporaryFile(mode='w+t') as creates_file, \
+            tempfile.TemporaryFile(mode='w+t') as indexes_file, \
+            tempfile.TemporaryFile(mode='w+t') as foreign_keys_file:
+
+        step.generate_ddl(schema, tables, creates_file, indexes_file, foreign_keys_file)
+
+        step.target_database_name = step.loading_database_name
+        step.re_create_database(creates_file)
+        step.load_inserts(iter(data))
+
+        # No source to read table sizes from, so the
+        # tables' constraints are created in any order
+        step.create_constraints(indexes_file, foreign_keys_file)
+
+        indexes_file.seek(0)
+        indexes = statements_by_table(indexes_file)
+
+    step.swap_in_loaded_database()
+
+    return step, data, indexes
+
+
+def check(rows):
+    step, data, indexes = load(rows)
+    failures = 0
+
+    expected = Counter(line.split('"')[1] for line in data)
+    actual = step.destination.row_counts(step.destination_database_name)
+
+    for table in sorted(set(expected) | set(actual)):
+        print('{:<20} {:>10,} rows'.format(table, actual.get(table, 0)), end='')
+
+        if actual.get(table, 0) != expected.get(table, 0):
+            failures += 1
+            print('  expected {:,}'.format(expected.get(table, 0)), end='')
+
+        print()
+
+    with step.destination.cursor(step.destination_database_name) as cursor:
+        cursor.execute("SELECT tbl_name, name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")
+        created = Counter()
+
+        for table, name in cursor.fetchall():
+            created[table] += 1
+
+            # Index names are unique within a SQLite database
+            if not name.startswith(table + '__'):
+                failures += 1
+                print('{}: index {} is not named for its table'.format(table, name))
+
+    for table, statements in sorted(indexes.items()):
+        if created.get(table, 0) != len(statements):
+            failures += 1
+            print('{}: {} of {} indexes created'.format(table, created.get(table, 0), len(statements)))
+
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load the synthetic dump into SQLite through a datalake step.')
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    failures = check(args.rows)
+
+    if failures:
+        print('{} checks failed'.format(failures))
+        sys.exit(1)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import argparse
+from api.database import etl_central_session
+from api.model import EtlDatalakeMetric
+
+PHASES = ['dump', 'transform', 'execute', 'index', 'foreign_key']
+
+
+def get_parameters():
+    parser = argparse.ArgumentParser(description='Compare the throughput of datalake loads.')
+    parser.add_argument(
+        'database_name',
+        help='Source database name',
+    )
+    parser.add_argument(
+        '-r',
+        '--runs',
+        type=int,
+        help='Number of most recent loads to compare',
+        default=2,
+    )
+    parser.add_argument(
+        '-t',
+        '--tables',
+        type=int,
+        help='Number of slowest tables to show',
+        default=20,
+    )
+    parser.add_argument(
+        '-i',
+        '--incomplete',
+        help='Include loads that did not complete',
+        action='store_true',
+    )
+
+    return parser.parse_args()
+
+
+def recent_runs(session, database_name, runs, incomplete=False):
+    """Gets the totals of the most recent loads of a database"""
+    q = session.query(EtlDatalakeMetric).filter(
+        EtlDatalakeMetric.database_name == database_name,
+        EtlDatalakeMetric.table_name.is_(None),
+    )
+
+    if not incomplete:
+        q = q.filter(EtlDatalakeMetric.completed.is_(True))
+
+    return list(reversed(q.order_by(EtlDatalakeMetric.created_datetime.desc()).limit(runs).all()))
+
+
+def table_metrics(session, database_name, runs):
+    """Gets the metrics of each table for each of the loads,
+    keyed by table name and then the load's task id.
+    """
+    result = {}
+
+    for m in session.query(EtlDatalakeMetric).filter(
+        EtlDatalakeMetric.database_name == database_name,
+        EtlDatalakeMetric.table_name.isnot(None),
+        EtlDatalakeMetric.etl_task_id.in_([r.etl_task_id for r in runs]),
+    ).all():
+        result.setdefault(m.table_name, {})[m.etl_task_id] = m
+
+    return result
+
+
+def load_seconds(m):
+    return m.dump_seconds + m.transform_seconds + m.execute_seconds
+
+
+def describe(m):
+    seconds = load_seconds(m)
+
+    return '{:>12,} rows {:>10,.0f} rows/s {:>9,.1f} MB read {:>9,.1f} MB sent  {}'.format(
+        m.rows,
+        m.rows / seconds if seconds else 0,
+        m.bytes_read / 1e6,
+        m.bytes_sent / 1e6,
+        '  '.join('{} {:,.1f}s'.format(p, getattr(m, '{}_seconds'.format(p))) for p in PHASES),
+    )
+
+
+def run():
+    args = get_parameters()
+
+    with etl_central_session() as session:
+        runs = recent_runs(session, args.database_name, args.runs, args.incomplete)
+
+        if not runs:
+            print("No loads of '{}' recorded".format(args.database_name))
+            return
+
+        tables = table_metrics(session, args.database_name, runs)
+
+        print("Loads of '{}'".format(args.database_name))
+
+        for r in runs:
+            print('  {:%Y-%m-%d %H:%M} {:<11} {:>8,.0f}s {}'.format(
+                r.created_datetime,
+                r.load_type or '',
+                r.total_seconds or 0,
+                describe(r),
+            ))
+
+        # Slowest tables in the latest load first
+        latest = runs[-1].etl_task_id
+        slowest = sorted(
+            tables.items(),
+            key=lambda t: load_seconds(t[1][latest]) if latest in t[1] else 0,
+            reverse=True,
+        )
+
+        for table, loads in slowest[:args.tables]:
+            print()
+            print(table)
+
+            for r in runs:
+                if r.etl_task_id in loads:
+                    print('  {:%Y-%m-%d %H:%M} {}'.format(r.created_datetime, describe(loads[r.etl_task_id])))
+                else:
+                    print('  {:%Y-%m-%d %H:%M} not loaded'.format(r.created_datetime))
+
+
+if __name__ == '__main__':
+    run()
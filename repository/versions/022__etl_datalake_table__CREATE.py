@@ -0,0 +1,37 @@
+from sqlalchemy import (
+    MetaData,
+    Table,
+    Column,
+    Integer,
+    NVARCHAR,
+    DateTime,
+    UniqueConstraint,
+)
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    t = Table(
+        "etl_datalake_table",
+        meta,
+        Column("id", Integer, primary_key=True),
+        Column("database_name", NVARCHAR(200), nullable=False),
+        Column("table_name", NVARCHAR(200), nullable=False),
+        Column("key_column", NVARCHAR(200)),
+        Column("key_type", NVARCHAR(50)),
+        Column("high_water_mark", NVARCHAR(100)),
+        Column("column_signature", NVARCHAR(64)),
+        Column("last_load_datetime", DateTime),
+        Column("last_full_load_datetime", DateTime),
+        UniqueConstraint("database_name", "table_name", name="uix__etl_datalake_table__database_name__table_name"),
+    )
+    t.create()
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+    t = Table("etl_datalake_table", meta, autoload=True)
+    t.drop()
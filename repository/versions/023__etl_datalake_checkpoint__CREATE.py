@@ -0,0 +1,37 @@
+from sqlalchemy import (
+    MetaData,
+    Table,
+    Column,
+    Integer,
+    NVARCHAR,
+    DateTime,
+    Boolean,
+    UniqueConstraint,
+)
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    t = Table(
+        "etl_datalake_checkpoint",
+        meta,
+        Column("id", Integer, primary_key=True),
+        Column("database_name", NVARCHAR(200), nullable=False),
+        Column("table_name", NVARCHAR(200), nullable=False),
+        Column("load_start_datetime", DateTime, nullable=False),
+        Column("records", Integer, nullable=False),
+        Column("batches", Integer, nullable=False),
+        Column("completed", Boolean, nullable=False),
+        Column("updated_datetime", DateTime, nullable=False),
+        UniqueConstraint("database_name", "table_name", name="uix__etl_datalake_checkpoint__database_name__table_name"),
+    )
+    t.create()
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+    t = Table("etl_datalake_checkpoint", meta, autoload=True)
+    t.drop()
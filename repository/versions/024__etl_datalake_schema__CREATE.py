@@ -0,0 +1,36 @@
+from sqlalchemy import (
+    MetaData,
+    Table,
+    Column,
+    Integer,
+    NVARCHAR,
+    DateTime,
+    UniqueConstraint,
+    TEXT,
+)
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    t = Table(
+        "etl_datalake_schema",
+        meta,
+        Column("id", Integer, primary_key=True),
+        Column("database_name", NVARCHAR(200), nullable=False),
+        Column("fingerprint", NVARCHAR(64), nullable=False),
+        Column("creates", TEXT, nullable=False),
+        Column("indexes", TEXT, nullable=False),
+        Column("foreign_keys", TEXT, nullable=False),
+        Column("updated_datetime", DateTime, nullable=False),
+        UniqueConstraint("database_name", name="uix__etl_datalake_schema__database_name"),
+    )
+    t.create()
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+    t = Table("etl_datalake_schema", meta, autoload=True)
+    t.drop()
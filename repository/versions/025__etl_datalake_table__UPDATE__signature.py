@@ -0,0 +1,23 @@
+from sqlalchemy import (
+    MetaData,
+    Table,
+    Column,
+    NVARCHAR,
+)
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    t = Table("etl_datalake_table", meta, autoload=True)
+
+    signature = Column("signature", NVARCHAR(100))
+    signature.create(t)
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+    t = Table("etl_datalake_table", meta, autoload=True)
+
+    t.c.signature.drop()
@@ -0,0 +1,36 @@
+from sqlalchemy import (
+    MetaData,
+    Table,
+    Column,
+    Integer,
+    NVARCHAR,
+    DateTime,
+    Boolean,
+    LargeBinary,
+    UniqueConstraint,
+)
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    t = Table(
+        "etl_attachment",
+        meta,
+        Column("id", Integer, primary_key=True),
+        Column("hash", NVARCHAR(64), nullable=False),
+        Column("size", Integer, nullable=False),
+        Column("truncated", Boolean, nullable=False),
+        Column("content", LargeBinary, nullable=False),
+        Column("created_datetime", DateTime, nullable=False),
+        UniqueConstraint("hash", name="uix__etl_attachment__hash"),
+    )
+    t.create()
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+    t = Table("etl_attachment", meta, autoload=True)
+    t.drop()
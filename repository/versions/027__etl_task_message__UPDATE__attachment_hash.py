@@ -0,0 +1,23 @@
+from sqlalchemy import (
+    MetaData,
+    Table,
+    Column,
+    NVARCHAR,
+)
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    t = Table("etl_task_message", meta, autoload=True)
+
+    attachment_hash = Column("attachment_hash", NVARCHAR(64))
+    attachment_hash.create(t)
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+    t = Table("etl_task_message", meta, autoload=True)
+
+    t.c.attachment_hash.drop()
@@ -0,0 +1,34 @@
+from sqlalchemy import (
+    MetaData,
+    Table,
+    Column,
+    Integer,
+    NVARCHAR,
+    DateTime,
+    TEXT,
+)
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    t = Table(
+        "etl_datalake_quarantine",
+        meta,
+        Column("id", Integer, primary_key=True),
+        Column("database_name", NVARCHAR(200), nullable=False, index=True),
+        Column("table_name", NVARCHAR(200)),
+        Column("load_start_datetime", DateTime),
+        Column("error", TEXT, nullable=False),
+        Column("content", TEXT, nullable=False),
+        Column("created_datetime", DateTime, nullable=False),
+    )
+    t.create()
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+    t = Table("etl_datalake_quarantine", meta, autoload=True)
+    t.drop()
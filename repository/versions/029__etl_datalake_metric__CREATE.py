@@ -0,0 +1,45 @@
+from sqlalchemy import (
+    MetaData,
+    Table,
+    Column,
+    Integer,
+    BigInteger,
+    Float,
+    NVARCHAR,
+    DateTime,
+    Boolean,
+)
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    t = Table(
+        "etl_datalake_metric",
+        meta,
+        Column("id", Integer, primary_key=True),
+        Column("etl_task_id", Integer),
+        Column("database_name", NVARCHAR(200), nullable=False, index=True),
+        Column("table_name", NVARCHAR(200)),
+        Column("load_type", NVARCHAR(50)),
+        Column("completed", Boolean, nullable=False),
+        Column("rows", BigInteger, nullable=False),
+        Column("bytes_read", BigInteger, nullable=False),
+        Column("bytes_sent", BigInteger, nullable=False),
+        Column("dump_seconds", Float, nullable=False),
+        Column("transform_seconds", Float, nullable=False),
+        Column("execute_seconds", Float, nullable=False),
+        Column("index_seconds", Float, nullable=False),
+        Column("foreign_key_seconds", Float, nullable=False),
+        Column("total_seconds", Float),
+        Column("created_datetime", DateTime, nullable=False),
+    )
+    t.create()
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+    t = Table("etl_datalake_metric", meta, autoload=True)
+    t.drop()
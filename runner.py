@@ -3,6 +3,8 @@
 import logging
 import argparse
 from api.core import run_all, schedule_etls, run_etls
+from api.database import log_pool_statistics
+from api import profiling
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -30,6 +32,12 @@ def get_parameters():
         help="Run all reports",
         action="store_true",
     )
+    parser.add_argument(
+        '-p',
+        '--profile',
+        nargs='*',
+        help='Report names or start of the report names to profile, or all reports run if no names are given',
+    )
 
     args = parser.parse_args()
 
@@ -41,10 +49,14 @@ def run():
 
     exclude = [x.lower() for x in args.exclude]
 
+    if args.profile is not None:
+        profiling.enable(args.profile or [''])
+
     if args.all:
         run_all(exclude)
 
         logging.info("---- All ETLs run ----")
+        log_pool_statistics()
     elif not args.report_names:
         schedule_etls()
     else:
@@ -52,3 +64,4 @@ def run():
             run_etls(report_name, exclude)
 
         logging.info("---- All ETLs run ----")
+        log_pool_statistics()